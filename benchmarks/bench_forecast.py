@@ -0,0 +1,49 @@
+"""Прогноз на тике: полное переобучение против дообучения update() при разной длине истории
+
+Запуск: python -m benchmarks.bench_forecast [количество свечей ...]
+"""
+import sys
+import time
+
+from benchmarks.synthetic import make_candles
+from config import FORECAST_PERIODS
+from forecast.base import FORECASTERS, get_forecaster
+import forecast.models  # Регистрация встроенных методов
+
+ONLINE_TICKS = 5  # Новых свечей для замера дообучения (каждый повтор - следующая свеча)
+
+
+def measure(func, repeats=5):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(sizes):
+    methods = [name for name, cls in FORECASTERS.items() if cls.online and cls.is_available() and name != "LSTM"]
+    print(f"{'свечей':>8} | {'метод':>22} | {'fit, мс':>10} | {'update, мс':>10}")
+    for n in sizes:
+        df = make_candles(n + ONLINE_TICKS)
+        timestamp, close = df['timestamp'].to_numpy(), df['close'].to_numpy()
+        for method in methods:
+            def full():
+                get_forecaster(method).fit(timestamp[1:n + 1], close[1:n + 1]).predict(FORECAST_PERIODS)
+
+            # Модель обучена на n свечах, дообучение идет по следующим, каждый раз новой
+            model = get_forecaster(method).fit(timestamp[:n], close[:n])
+            held_out = iter(range(n, n + ONLINE_TICKS))
+
+            def online():
+                i = next(held_out)
+                model.update(timestamp[i:i + 1], close[i:i + 1]).predict(FORECAST_PERIODS)
+
+            repeats = 1 if n > 20000 else 3
+            print(f"{n:>8} | {method:>22} | {measure(full, repeats) * 1000:>10.1f} | "
+                  f"{measure(online, ONLINE_TICKS) * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1440, 10080, 43200])
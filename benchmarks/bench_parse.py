@@ -0,0 +1,68 @@
+"""Разбор свечей Bybit: прежний поколоночный разбор в DataFrame против однопроходного parse_candles
+
+Запуск: python -m benchmarks.bench_parse [количество свечей ...]
+"""
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.synthetic import make_candles
+from config import TIMEREGION
+from data.fetch_data import KLINE_COLUMNS
+from data.preprocess_data import parse_candles
+
+
+def legacy_prepare(raw_df):
+    """Прежний путь: to_numeric на каждую колонку, dropna, сортировка"""
+    raw_df = raw_df.sort_values('timestamp')
+    raw_df['timestamp'] = pd.to_numeric(raw_df['timestamp'], errors='coerce')
+    raw_df = raw_df.dropna(subset=['timestamp'])
+    raw_df['ds'] = pd.to_datetime(raw_df['timestamp'].astype('int64') // 1000 + TIMEREGION * 3600, unit='s')
+    for col in ['open', 'high', 'low', 'close', 'volume', 'turnover']:
+        raw_df[col] = pd.to_numeric(raw_df[col], errors='coerce')
+    return raw_df[['ds', 'timestamp', 'open', 'high', 'low', 'close', 'volume', 'turnover']]
+
+
+def kline_rows(n):
+    """Ответ result.list в формате Bybit: строки, от новых свечей к старым"""
+    df = make_candles(n)
+    rows = [[str(ts), f"{o:.2f}", f"{h:.2f}", f"{l:.2f}", f"{c:.2f}", f"{v:.6f}", f"{t:.4f}"]
+            for ts, o, h, l, c, v, t in df[KLINE_COLUMNS].itertuples(index=False)]
+    return rows[::-1]
+
+
+def measure(func, make_input, repeats):
+    """Лучшее время и пиковая память (tracemalloc) разбора"""
+    best = float('inf')
+    for _ in range(repeats):
+        data = make_input()
+        start = time.perf_counter()
+        func(data)
+        best = min(best, time.perf_counter() - start)
+
+    data = make_input()
+    tracemalloc.start()
+    func(data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def main(sizes):
+    print(f"{'свечей':>8} | {'путь':>22} | {'время, мс':>10} | {'пик памяти, МБ':>15}")
+    for n in sizes:
+        rows = kline_rows(n)
+        paths = [
+            ('DataFrame + to_numeric', legacy_prepare, lambda: pd.DataFrame(rows, columns=KLINE_COLUMNS)),
+            ('DataFrame -> NumPy', parse_candles, lambda: pd.DataFrame(rows, columns=KLINE_COLUMNS)),
+            ('список -> NumPy', parse_candles, lambda: rows),
+        ]
+        for name, func, make_input in paths:
+            elapsed, peak = measure(func, make_input, repeats=5)
+            print(f"{n:>8} | {name:>22} | {elapsed * 1000:>10.1f} | {peak / 2 ** 20:>15.1f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1440, 10080, 43200])
@@ -0,0 +1,112 @@
+"""Сравнение отрисовки свечей: цикл plot/bar на каждую свечу против коллекций,
+полное перестроение против инкрементального обновления на тике
+
+Запуск: python -m benchmarks.bench_render [количество свечей ...]
+"""
+import sys
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.dates as mdates
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from benchmarks.synthetic import make_candles
+from chart.candles import CandlestickRenderer
+
+
+def legacy_draw(ax, df):
+    """Прежний путь: два артиста Matplotlib на каждую свечу"""
+    dates = mdates.date2num(df['ds'])
+    time_diffs = np.diff(dates)
+    avg_time_diff = np.mean(time_diffs) if len(time_diffs) > 0 else 0.001
+    width = avg_time_diff * 0.7
+    for i in range(len(dates)):
+        t = dates[i]
+        open_price = df['open'].iloc[i]
+        close_price = df['close'].iloc[i]
+        high_price = df['high'].iloc[i]
+        low_price = df['low'].iloc[i]
+        color = '#2ecc71' if close_price >= open_price else '#e74c3c'
+        ax.plot([t, t], [low_price, high_price], color=color, linewidth=1, solid_capstyle='round')
+        ax.bar(t, abs(close_price - open_price), bottom=min(open_price, close_price),
+               width=width, color=color, edgecolor=color)
+    return avg_time_diff
+
+
+def vectorized_draw(ax, df):
+    """Новый путь: LineCollection + PolyCollection"""
+    renderer = CandlestickRenderer(ax)
+    return renderer.draw(
+        mdates.date2num(df['ds']),
+        df['open'].to_numpy(),
+        df['high'].to_numpy(),
+        df['low'].to_numpy(),
+        df['close'].to_numpy()
+    )
+
+
+def measure(draw, df, repeats):
+    """Лучшее время построения и рендеринга (Agg) за несколько повторов"""
+    build_best = render_best = float('inf')
+    for _ in range(repeats):
+        fig = Figure(figsize=(10, 6), dpi=100)
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot(111)
+        start = time.perf_counter()
+        draw(ax, df)
+        ax.set_xlim(mdates.date2num(df['ds'].iloc[0]), mdates.date2num(df['ds'].iloc[-1]))
+        ax.set_ylim(df['low'].min(), df['high'].max())
+        built = time.perf_counter()
+        fig.canvas.draw()
+        rendered = time.perf_counter()
+        build_best = min(build_best, built - start)
+        render_best = min(render_best, rendered - built)
+    return build_best, render_best
+
+
+def measure_tick(df, repeats=20):
+    """Среднее время тика: полное перестроение против инкрементального update"""
+    fig = Figure(figsize=(10, 6), dpi=100)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    renderer = CandlestickRenderer(ax)
+    dates = mdates.date2num(df['ds'])
+    columns = [df[col].to_numpy() for col in ('open', 'high', 'low', 'close')]
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        renderer.draw(dates, *columns)
+    full = (time.perf_counter() - start) / repeats
+
+    step = dates[-1] - dates[-2]
+    start = time.perf_counter()
+    for i in range(repeats):
+        # Правка формирующейся свечи и появление новой
+        renderer.update([dates[-1] + i * step, dates[-1] + (i + 1) * step],
+                        *[[col[-1], col[-1]] for col in columns])
+    incremental = (time.perf_counter() - start) / repeats
+    return full, incremental
+
+
+def main(sizes):
+    print(f"{'свечей':>8} | {'путь':>12} | {'построение, мс':>15} | {'рендер, мс':>11}")
+    for n in sizes:
+        df = make_candles(n)
+        paths = [('коллекции', vectorized_draw, 5)]
+        if n <= 5000:  # Прежний путь на больших объемах занимает минуты
+            paths.insert(0, ('цикл', legacy_draw, 1))
+        for name, draw, repeats in paths:
+            build, render = measure(draw, df, repeats)
+            print(f"{n:>8} | {name:>12} | {build * 1000:>15.1f} | {render * 1000:>11.1f}")
+
+    print(f"\n{'свечей':>8} | {'полный тик, мс':>15} | {'update, мс':>11}")
+    for n in sizes:
+        full, incremental = measure_tick(make_candles(n))
+        print(f"{n:>8} | {full * 1000:>15.2f} | {incremental * 1000:>11.2f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 2880, 10000, 100000])
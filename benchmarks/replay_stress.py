@@ -0,0 +1,215 @@
+"""Нагрузочная проверка воспроизведением: при каком ускорении главный поток или прогнозы перестают успевать
+
+Запуск: python -m benchmarks.replay_stress [--fixture klines.json] [--speeds 60 250 1000]
+                                          [--seconds 10] [--instruments 6] [--forecast ARIMA]
+Работает без окна Tk и без сети: data.replay.ReplayWatchlist воспроизводит запись
+(по умолчанию - синтетические свечи), а цикл главного потока, как process_bus
+приложения, с периодом BUS_POLL_MS разбирает очередь через data.dispatch: слияние,
+индикаторы, правка графика и рендер Agg, автообновление прогноза. Для каждого ускорения - сколько свечей
+применено, задержка replay.lag, время отрисовки, потери очереди и прогнозы,
+вытесненные новыми свечами до завершения.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+
+from benchmarks.suite import chart_rows, new_axes
+from chart.candles import CandlestickRenderer
+from chart.lod import OHLCPyramid
+from config import BUS_POLL_MS, FORECAST_PERIODS, INTERVAL, LOD_PIXELS_PER_CANDLE, REPLAY_HISTORY_HOURS, WATCHLIST
+from data.bus import DataBus
+from data.dispatch import dispatch_events
+from data.indicators import IndicatorSeries
+from data.replay import ReplayWatchlist
+from forecast.cache import ForecastCache, closed_forecast_key
+from forecast.runner import ForecastRunner
+from metrics import registry
+from tools.fake_bybit_rest import synthetic_rows
+
+SPEEDS = [60, 250, 1000]
+LAG_LIMIT_MS = 1000  # Задержка p95, с которой считаем, что главный поток не успевает
+
+
+class Chart:
+    """График открытого инструмента без Tk: как plot_candlestick и update_chart приложения.
+
+    Получает уведомления data.dispatch вместо окна; с forecast - обновляет прогноз на новых свечах.
+    """
+
+    def __init__(self, instrument, forecast=None):
+        self.instrument = instrument
+        self.candles = instrument.candles
+        self.forecast = forecast
+        self.fig, self.ax = new_axes()
+        self.renderer = CandlestickRenderer(self.ax)
+        self.lod = OHLCPyramid()
+        self.indicators = IndicatorSeries(self.candles)
+
+    def plot(self):
+        rows = chart_rows({name: self.candles.column(name) for name in ('timestamp', 'open', 'high', 'low', 'close')})
+        self.lod.build(rows)
+        max_candles = max(int(self.ax.bbox.width / LOD_PIXELS_PER_CANDLE), 1)
+        x_min = rows[-max_candles, 0] if len(rows) > max_candles else rows[0, 0]
+        self.ax.set_xlim(x_min, rows[-1, 0])
+        self.ax.set_ylim(self.candles.low.min(), self.candles.high.max())
+        self.renderer.draw(*self.lod.select(x_min, rows[-1, 0], max_candles)[3].T)
+        self.indicators.sync()
+        self.fig.canvas.draw()
+
+    def update(self, changed):
+        with registry.timer('draw'):
+            rows = chart_rows(changed)
+            self.lod.update(rows)
+            self.renderer.update(*rows.T)
+            self.indicators.sync()
+            self.fig.canvas.draw()
+
+    def on_preview(self, instrument):
+        """Воспроизведение не читает хранилище до истории"""
+
+    def on_history(self, instrument):
+        if instrument is self.instrument and not self.candles.empty:
+            self.plot()
+
+    def on_update(self, instrument, changed):
+        if instrument is self.instrument:
+            self.update(changed)
+            if self.forecast is not None:
+                self.forecast.update(self.candles)
+
+
+class AutoForecast:
+    """Автообновление прогноза как run_forecast приложения: закрытые свечи, ключ и кэш, дообучение модели"""
+
+    def __init__(self, method, label, bus, directory):
+        self.method = method
+        self.label = label
+        self.bus = bus
+        self.runner = ForecastRunner(cache=ForecastCache(directory=directory))
+        self.key = None
+        self.results = []
+
+    def update(self, candles):
+        request = closed_forecast_key(self.label, INTERVAL, candles.timestamp, self.method, {}, FORECAST_PERIODS)
+        if request is None:
+            return
+        closed, key = request
+        if key == self.key:
+            return
+        self.key = key
+        self.runner.submit(
+            self.method, {}, candles.timestamp[:closed], candles.close[:closed], FORECAST_PERIODS,
+            on_done=lambda result: self.bus.call(self.results.append, result),
+            on_error=lambda error: self.bus.call(print, f"Ошибка прогноза: {str(error)}"),
+            cache_key=key
+        )
+
+
+def run_speed(source, speed, seconds, instruments, method=None):
+    """Воспроизведение с ускорением speed в течение seconds секунд, возвращает итоги по метрикам"""
+    registry.reset()
+    bus = DataBus()
+    watchlist = ReplayWatchlist(bus, source=source, speed=speed, instruments=instruments)
+    shown = watchlist.get(instruments[0])
+    cache_dir = tempfile.mkdtemp() if method else None  # Кэш прогнозов на диске, как в приложении
+    forecast = AutoForecast(method, shown.label, bus, cache_dir) if method else None
+    chart = Chart(shown, forecast)
+
+    watchlist.start()
+    deadline = time.perf_counter() + seconds
+    try:
+        while time.perf_counter() < deadline:
+            cycle = time.perf_counter()
+            dispatch_events(bus, watchlist, chart)
+            time.sleep(max(BUS_POLL_MS / 1000 - (time.perf_counter() - cycle), 0))
+    finally:
+        watchlist.stop()
+        if forecast is not None:
+            forecast.runner.shutdown()
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    snapshot = registry.snapshot()
+    lag = snapshot['timings'].get('replay.lag') or {}
+    draw = snapshot['timings'].get('draw') or {}
+    counters = snapshot['counters']
+    expected = int(seconds * speed / (INTERVAL * 60)) * len(instruments)
+    return {
+        'speed': speed,
+        'expected': expected,
+        'published': counters.get('replay.candles', 0),
+        'applied': counters.get('merge.candles', 0),
+        'lag_p50_ms': lag.get('p50'),
+        'lag_p95_ms': lag.get('p95'),
+        'lag_max_ms': lag.get('max'),
+        'draw_p95_ms': draw.get('p95'),
+        'dropped': counters.get('bus.dropped', 0),
+        'forecasts': len(forecast.results) if forecast else 0,
+        'superseded': counters.get('forecast.superseded', 0),
+    }
+
+
+def print_result(result):
+    def ms(value):
+        return f"{value:>9.1f}" if value is not None else f"{'-':>9}"
+
+    verdict = []
+    if (result['dropped'] or (result['lag_p95_ms'] or 0) > LAG_LIMIT_MS
+            or result['published'] < result['expected'] * 0.9):
+        verdict.append("график отстает")
+    if result['superseded'] > result['forecasts']:
+        verdict.append("прогнозы отстают")
+    print(f"{result['speed']:>7g} | {result['published']:>7}/{result['expected']:<7} | {result['applied']:>8} | "
+          f"{ms(result['lag_p50_ms'])} | {ms(result['lag_p95_ms'])} | {ms(result['lag_max_ms'])} | "
+          f"{ms(result['draw_p95_ms'])} | {result['dropped']:>6} | {result['forecasts']:>4}/{result['superseded']:<4} | "
+          f"{', '.join(verdict) or 'успевает'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fixture', default=None,
+                        help="Запись свечей (python -m tools.fake_bybit_rest record) вместо синтетических")
+    parser.add_argument('--speeds', type=float, nargs='+', default=SPEEDS, help="Ускорения (1-1000)")
+    parser.add_argument('--seconds', type=float, default=10, help="Длительность воспроизведения на ускорение")
+    parser.add_argument('--instruments', type=int, default=len(WATCHLIST), help="Сколько инструментов списка")
+    parser.add_argument('--forecast', default=None, help="Метод автообновляемого прогноза (без него - только график)")
+    parser.add_argument('--output', default=None, help="Путь для результатов в JSON")
+    args = parser.parse_args()
+
+    source = args.fixture
+    if source is None:
+        # Синтетическая запись: история и свечи на самое долгое воспроизведение
+        count = int(REPLAY_HISTORY_HOURS * 60 / INTERVAL + args.seconds * max(args.speeds) / (INTERVAL * 60)) + 1
+        fd, source = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(synthetic_rows(count), f)
+
+    print(f"{'ускор.':>7} | {'отправлено':>15} | {'слито':>8} | {'lag p50':>9} | {'lag p95':>9} | {'lag max':>9} | "
+          f"{'draw p95':>9} | {'потери':>6} | {'прогнозы':>9} |")
+    results = []
+    try:
+        for speed in args.speeds:
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = run_speed(source, speed, args.seconds, WATCHLIST[:args.instruments], args.forecast)
+            results.append(result)
+            print_result(result)
+    finally:
+        if args.fixture is None:
+            os.remove(source)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'seconds': args.seconds, 'forecast': args.forecast, 'results': results}, f,
+                      ensure_ascii=False, indent=2)
+        print(f"\nРезультаты сохранены: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""Набор бенчмарков горячих путей: загрузка с биржи, разбор, слияние обновлений, отрисовка
+
+Запуск: python -m benchmarks.suite [--sizes 1000 10000 ...] [--stages fetch parse ...]
+                                   [--fixture klines.json] [--output results.json] [--profile DIR]
+Работает без сети: загрузка идет с локального сервера tools.fake_bybit_rest (отдельный
+процесс) по синтетическим свечам или записи реального API (--fixture). Для каждого
+этапа и объема - лучшее время из нескольких повторов, пропускная способность и пик
+памяти (tracemalloc, отдельным прогоном). --output сохраняет результаты в JSON
+для сравнения между версиями.
+"""
+import argparse
+import contextlib
+import cProfile
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from chart.candles import CandlestickRenderer, timestamps_to_num
+from chart.lod import OHLCPyramid
+from config import LOD_PIXELS_PER_CANDLE
+from data import fetch_data
+from data.bus import coalesce_columns, frozen_columns
+from data.candle_buffer import CandleBuffer, FIELDS
+from data.preprocess_data import parse_candles
+from data.rate_limit import TokenBucket
+from data.resample import TimeframeAggregator
+from tools.fake_bybit_rest import load_rows, synthetic_rows, tile_rows
+
+SIZES = [1000, 10000, 100000, 1000000]
+TICKS = 200             # Тиков в замере обновления буфера
+RENDER_TICKS = 50       # Тиков в замере перерисовки (каждый - полный рендер Agg)
+FIGURE_SIZE = (12, 8)   # Окно приложения 1200x800 при dpi 100
+
+
+class MockServer:
+    """tools.fake_bybit_rest в отдельном процессе - его работа не попадает в замеры памяти клиента"""
+
+    def __init__(self, candles, fixture=None):
+        command = [sys.executable, '-m', 'tools.fake_bybit_rest', 'serve', '--port', '0', '--candles', str(candles)]
+        if fixture:
+            command += ['--fixture', fixture]
+        self.process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+        url, start_ms, end_ms = self.process.stdout.readline().split()
+        self.url = url
+        self.start_ms, self.end_ms = int(start_ms), int(end_ms)
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait()
+
+
+@contextlib.contextmanager
+def offline_api(url):
+    """Загрузка через data.fetch_data с локального сервера и без лимита частоты запросов"""
+    saved = fetch_data.BYBIT_API_URL, fetch_data.rate_limiter
+    fetch_data.BYBIT_API_URL = url
+    fetch_data.rate_limiter = TokenBucket(1e9)
+    try:
+        yield
+    finally:
+        fetch_data.BYBIT_API_URL, fetch_data.rate_limiter = saved
+
+
+def chart_rows(columns):
+    return np.column_stack([timestamps_to_num(columns['timestamp']), columns['open'],
+                            columns['high'], columns['low'], columns['close']])
+
+
+def new_axes():
+    fig = Figure(figsize=FIGURE_SIZE, dpi=100)
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplot(111)
+
+
+def tick_batches(columns, ticks):
+    """Пачки как со стрима: две правки формирующейся свечи и следующая свеча"""
+    last = {name: columns[name][-1] for name in FIELDS}
+    batches = []
+    for i in range(ticks):
+        ts = last['timestamp'] + np.array([i, i, i + 1], dtype=np.int64) * 60000
+        close = last['close'] + np.array([i, i + 0.5, i + 1.0])
+        batch = {'timestamp': ts, 'open': np.full(3, last['close']), 'close': close,
+                 'high': close + 1, 'low': close - 1, 'volume': np.ones(3), 'turnover': close}
+        batches.append([{name: batch[name][j:j + 1] for name in FIELDS} for j in range(3)])
+    return batches
+
+
+# Этапы: prepare(data) -> вход одного прогона (не замеряется), run(вход) -> замеряемая работа.
+# data - общий словарь объема: rows (строки Bybit), columns (разобранные колонки), server
+
+def prepare_fetch(data):
+    return data['server']
+
+
+def run_fetch(server):
+    with offline_api(server.url), contextlib.redirect_stdout(io.StringIO()):
+        rows = fetch_data.fetch_candles_range(server.start_ms, server.end_ms)
+    return {'requests': len(fetch_data.split_windows(server.start_ms, server.end_ms)), 'rows': len(rows)}
+
+
+def prepare_parse(data):
+    return data['rows']
+
+
+def run_parse(rows):
+    parse_candles(rows)
+
+
+def prepare_merge(data):
+    buffer = CandleBuffer(capacity=len(data['rows']))
+    timeframes = TimeframeAggregator(buffer)
+    timeframes.get(5)
+    return buffer, timeframes, data['columns']
+
+
+def run_merge(args):
+    """Загрузка истории в буфер и досчет открытого таймфрейма"""
+    buffer, timeframes, columns = args
+    buffer.extend(columns)
+    timeframes.update()
+
+
+def prepare_tick(data):
+    buffer, timeframes, columns = prepare_merge(data)
+    run_merge((buffer, timeframes, columns))
+    return buffer, timeframes, tick_batches(columns, TICKS)
+
+
+def run_tick(args):
+    """TICKS обновлений: слияние пачек шины, фильтр по времени, буфер, таймфрейм (как Instrument.apply)"""
+    buffer, timeframes, batches = args
+    for batch in batches:
+        columns = coalesce_columns(batch)
+        newer = columns['timestamp'] >= buffer.last_timestamp
+        buffer.extend({name: column[newer] for name, column in columns.items()})
+        timeframes.update()
+
+
+def prepare_render(data):
+    return new_axes(), data['columns']
+
+
+def run_render(args):
+    """Построение графика как в plot_candlestick: пирамида детализации, видимые свечи, рендер Agg"""
+    (fig, ax), columns = args
+    started = time.perf_counter()
+    rows = chart_rows(columns)
+    lod = OHLCPyramid()
+    lod.build(rows)
+    ax.set_xlim(rows[0, 0], rows[-1, 0])
+    ax.set_ylim(columns['low'].min(), columns['high'].max())
+    max_candles = max(int(ax.bbox.width / LOD_PIXELS_PER_CANDLE), 1)
+    level, lo, hi, visible = lod.select(rows[0, 0], rows[-1, 0], max_candles)
+    CandlestickRenderer(ax).draw(*visible.T)
+    built = time.perf_counter()
+    fig.canvas.draw()
+    return {'build_ms': (built - started) * 1000, 'draw_ms': (time.perf_counter() - built) * 1000,
+            'visible': int(hi - lo), 'level': int(level)}
+
+
+def prepare_render_tick(data):
+    (fig, ax), columns = prepare_render(data)
+    rows = chart_rows(columns)
+    lod = OHLCPyramid()
+    lod.build(rows)
+    # Последние свечи на подробном уровне, как при просмотре конца истории
+    max_candles = max(int(ax.bbox.width / LOD_PIXELS_PER_CANDLE), 1)
+    ax.set_xlim(rows[-max_candles, 0] if len(rows) > max_candles else rows[0, 0], rows[-1, 0] + RENDER_TICKS / 1440)
+    renderer = CandlestickRenderer(ax)
+    renderer.draw(*lod.select(*ax.get_xlim(), max_candles)[3].T)
+    fig.canvas.draw()
+    step = rows[-1, 0] - rows[-2, 0]
+    updates = []
+    for i in range(RENDER_TICKS):
+        row = rows[-1].copy()
+        row[0] += (i + 1) * step
+        updates.append(row[None, :])
+    return fig, lod, renderer, updates
+
+
+def run_render_tick(args):
+    """RENDER_TICKS тиков как в update_chart: хвост пирамиды, правка коллекций, рендер Agg"""
+    fig, lod, renderer, updates = args
+    for rows in updates:
+        lod.update(rows)
+        renderer.update(*rows.T)
+        fig.canvas.draw()
+
+
+STAGES = {
+    'fetch': (prepare_fetch, run_fetch),
+    'parse': (prepare_parse, run_parse),
+    'merge': (prepare_merge, run_merge),
+    'tick': (prepare_tick, run_tick),
+    'render': (prepare_render, run_render),
+    'render_tick': (prepare_render_tick, run_render_tick),
+}
+PER_TICK = {'tick': TICKS, 'render_tick': RENDER_TICKS}  # Этапы из нескольких тиков
+
+
+def measure(stage, data, repeats, profile_path=None):
+    """Лучшее время, пик памяти и дополнительные показатели последнего прогона этапа"""
+    prepare, run = STAGES[stage]
+    best = float('inf')
+    extra = None
+    for _ in range(repeats):
+        args = prepare(data)
+        started = time.perf_counter()
+        extra = run(args)
+        best = min(best, time.perf_counter() - started)
+
+    args = prepare(data)
+    tracemalloc.start()
+    run(args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    if profile_path:
+        args = prepare(data)
+        profiler = cProfile.Profile()
+        profiler.runcall(run, args)
+        profiler.dump_stats(profile_path)
+    return best, peak, extra or {}
+
+
+def load_data(count, fixture=None):
+    """Строки Bybit (по возрастанию времени, как после fetch_candles_range) и их колонки"""
+    rows = tile_rows(load_rows(fixture), count) if fixture else synthetic_rows(count)
+    columns = parse_candles(rows)
+    return {'rows': rows, 'columns': frozen_columns(columns, FIELDS)}
+
+
+def run_suite(sizes, stages, fixture=None, repeats=3, profile_dir=None):
+    results = []
+    for count in sizes:
+        data = load_data(count, fixture)
+        server = MockServer(count, fixture) if 'fetch' in stages else None
+        data['server'] = server
+        try:
+            for stage in stages:
+                profile_path = os.path.join(profile_dir, f"{stage}_{count}.prof") if profile_dir else None
+                # Большие объемы - по одному прогону, иначе набор идет десятки минут
+                seconds, peak, extra = measure(stage, data, repeats if count <= 100000 else 1, profile_path)
+                result = {'stage': stage, 'candles': count, 'seconds': seconds,
+                          'candles_per_sec': count / seconds if seconds and stage not in PER_TICK else None,
+                          'peak_mb': peak / 2 ** 20}
+                if stage in PER_TICK:
+                    result['per_tick_ms'] = seconds / PER_TICK[stage] * 1000
+                result.update({key: value for key, value in extra.items() if value is not None})
+                results.append(result)
+                print_result(result)
+        finally:
+            if server:
+                server.close()
+    return results
+
+
+def print_result(result):
+    speed = f"{result['candles_per_sec']:>14,.0f}" if result['candles_per_sec'] else f"{'-':>14}"
+    tick = f"{result['per_tick_ms']:>9.3f}" if 'per_tick_ms' in result else f"{'-':>9}"
+    print(f"{result['stage']:>11} | {result['candles']:>8} | {result['seconds'] * 1000:>10.1f} | {speed} | "
+          f"{tick} | {result['peak_mb']:>8.1f}")
+
+
+def environment():
+    """Версии и коммит - чтобы результаты разных запусков можно было сопоставить"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'matplotlib': matplotlib.__version__,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help="Количество свечей")
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=list(STAGES), help="Этапы")
+    parser.add_argument('--fixture', default=None,
+                        help="Запись свечей (python -m tools.fake_bybit_rest record) вместо синтетических")
+    parser.add_argument('--repeats', type=int, default=3, help="Повторов на этап (объемы до 100 000 свечей)")
+    parser.add_argument('--output', default=None, help="Путь для результатов в JSON")
+    parser.add_argument('--profile', default=None, help="Каталог для профилей cProfile (этап_объем.prof)")
+    args = parser.parse_args()
+    if args.profile:
+        os.makedirs(args.profile, exist_ok=True)
+
+    print(f"{'этап':>11} | {'свечей':>8} | {'время, мс':>10} | {'свечей/с':>14} | {'тик, мс':>9} | {'пик, МБ':>8}")
+    results = run_suite(args.sizes, args.stages, args.fixture, args.repeats, args.profile)
+
+    if args.output:
+        meta = environment()
+        meta.update({'fixture': args.fixture, 'ticks': TICKS, 'render_ticks': RENDER_TICKS, 'figure_size': FIGURE_SIZE})
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'environment': meta, 'results': results}, f, ensure_ascii=False, indent=2)
+        print(f"\nРезультаты сохранены: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
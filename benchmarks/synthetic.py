@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+
+
+def make_candles(n, start_ms=1_700_000_000_000, step_ms=60_000, seed=0):
+    """Синтетические минутные свечи: DataFrame с колонками API и временем ds"""
+    rng = np.random.default_rng(seed)
+    close = 30000 + np.cumsum(rng.normal(0, 15, n))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    spread = np.abs(rng.normal(0, 10, n))
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = np.abs(rng.normal(5, 2, n))
+    timestamp = start_ms + np.arange(n, dtype=np.int64) * step_ms
+    return pd.DataFrame({
+        'ds': pd.to_datetime(timestamp, unit='ms'),
+        'timestamp': timestamp,
+        'open': open_,
+        'high': high,
+        'low': low,
+        'close': close,
+        'volume': volume,
+        'turnover': volume * close
+    })
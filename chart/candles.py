@@ -0,0 +1,199 @@
+import numpy as np
+import matplotlib.dates as mdates
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.colors import to_rgba
+from config import TIMEREGION
+
+UP_COLOR = '#2ecc71'    # Зеленый - рост
+DOWN_COLOR = '#e74c3c'  # Красный - падение
+_UP_RGBA = np.array(to_rgba(UP_COLOR))
+_DOWN_RGBA = np.array(to_rgba(DOWN_COLOR))
+
+
+MS_PER_DAY = 24 * 60 * 60 * 1000
+_EPOCH_NUM = mdates.date2num(np.datetime64('1970-01-01T00:00:00'))
+
+
+def timestamps_to_num(timestamps):
+    """Время свечей в мс (UTC) в числовой формат Matplotlib с учетом часового пояса"""
+    return np.asarray(timestamps, dtype=np.float64) / MS_PER_DAY + TIMEREGION / 24 + _EPOCH_NUM
+
+
+def num_to_timestamps(nums):
+    """Обратное преобразование: числовой формат Matplotlib в мс (UTC)"""
+    return (np.asarray(nums, dtype=np.float64) - _EPOCH_NUM - TIMEREGION / 24) * MS_PER_DAY
+
+
+def candle_colors(open_, close):
+    """Массив RGBA-цветов свечей (n, 4): зеленый/красный"""
+    return np.where((close >= open_)[:, None], _UP_RGBA, _DOWN_RGBA)
+
+
+def wick_path(dates, low, high):
+    """Тени свечей одной ломаной (low, high, NaN) - NaN разрывает линию между свечами"""
+    path = np.full((len(dates), 3, 2), np.nan)
+    path[:, 0, 0] = dates
+    path[:, 1, 0] = dates
+    path[:, 0, 1] = low
+    path[:, 1, 1] = high
+    return path.reshape(-1, 2)
+
+
+def wick_segments(dates, open_, high, low, close):
+    """Два пути теней для LineCollection: растущие и падающие свечи.
+
+    Один Path на цвет вместо Path на каждую свечу - построение коллекции не зависит
+    от количества свечей на стороне Python.
+    """
+    up = close >= open_
+    down = ~up
+    return [
+        wick_path(dates[up], low[up], high[up]),
+        wick_path(dates[down], low[down], high[down])
+    ]
+
+
+def body_vertices(dates, open_, close, width):
+    """Прямоугольники тел свечей в формате (n, 4, 2) для PolyCollection"""
+    half = width / 2
+    bottom = np.minimum(open_, close)
+    top = np.maximum(open_, close)
+    verts = np.empty((len(dates), 4, 2))
+    verts[:, 0, 0] = dates - half
+    verts[:, 1, 0] = dates - half
+    verts[:, 2, 0] = dates + half
+    verts[:, 3, 0] = dates + half
+    verts[:, 0, 1] = bottom
+    verts[:, 1, 1] = top
+    verts[:, 2, 1] = top
+    verts[:, 3, 1] = bottom
+    return verts
+
+
+def candle_width(dates, ratio=0.7):
+    """Ширина свечи - доля от среднего интервала между свечами"""
+    time_diffs = np.diff(dates)
+    avg_time_diff = np.mean(time_diffs) if len(time_diffs) > 0 else 0.001
+    return avg_time_diff * ratio, avg_time_diff
+
+
+class _CandleBlock:
+    """Блок свечей: пара коллекций (тени + тела) и данные, из которых они построены"""
+
+    def __init__(self, ax, width):
+        self.width = width
+        self.data = np.empty((0, 5))  # Колонки: дата, open, high, low, close
+        self.wicks = LineCollection([], colors=[UP_COLOR, DOWN_COLOR], linewidths=1, capstyle='round')
+        self.bodies = PolyCollection([], linewidths=1)
+        ax.add_collection(self.wicks, autolim=False)
+        ax.add_collection(self.bodies, autolim=False)
+
+    def __len__(self):
+        return len(self.data)
+
+    def set_data(self, data):
+        """Перестроение коллекций блока по массиву (n, 5)"""
+        self.data = data
+        dates, open_, high, low, close = data.T
+        colors = candle_colors(open_, close)
+        self.wicks.set_segments(wick_segments(dates, open_, high, low, close))
+        self.bodies.set_verts(body_vertices(dates, open_, close, self.width))
+        self.bodies.set_facecolor(colors)
+        self.bodies.set_edgecolor(colors)
+
+    def remove(self):
+        """Удаление коллекций блока с осей"""
+        for artist in (self.wicks, self.bodies):
+            if artist.axes is not None:
+                artist.remove()
+
+
+class CandlestickRenderer:
+    """Векторизованная отрисовка свечей коллекциями Matplotlib.
+
+    Закрытые свечи хранятся блоками по block_size штук: в каждом блоке все тени -
+    одна LineCollection, все тела - одна PolyCollection. Формирующаяся последняя
+    свеча рисуется отдельным блоком, поэтому обновление графика на каждом тике
+    перестраивает не больше одного блока независимо от длины истории.
+    """
+
+    def __init__(self, ax, width_ratio=0.7, block_size=1024):
+        self.ax = ax
+        self.width_ratio = width_ratio
+        self.block_size = block_size
+        self.blocks = []
+        self.live = None
+        self.width = None
+
+    @property
+    def has_data(self):
+        """Есть ли на осях построенные свечи"""
+        return self.live is not None and self.live.wicks.axes is not None
+
+    def draw(self, dates, open_, high, low, close):
+        """Полное построение свечей по массивам NumPy, возвращает средний интервал между свечами"""
+        data = self._stack(dates, open_, high, low, close)
+        self.remove()
+
+        self.width, avg_time_diff = candle_width(data[:, 0], self.width_ratio)
+        if len(data) == 0:
+            return avg_time_diff
+
+        self._append_closed(data[:-1])
+        self.live = _CandleBlock(self.ax, self.width)
+        self.live.set_data(data[-1:])
+        return avg_time_diff
+
+    def update(self, dates, open_, high, low, close):
+        """Инкрементальное обновление: правка формирующейся свечи и добавление новых закрытых.
+
+        Строки старше формирующейся свечи игнорируются, свеча с той же датой заменяет
+        формирующуюся, более новые - закрывают ее и становятся формирующейся.
+        """
+        rows = self._stack(dates, open_, high, low, close)
+        if not self.has_data:
+            self.draw(*rows.T)
+            return
+
+        live = self.live.data[0]
+        closed = []
+        for row in rows[np.argsort(rows[:, 0], kind='stable')]:
+            if row[0] < live[0]:
+                continue
+            if row[0] > live[0]:
+                closed.append(live)
+            live = row
+
+        if closed:
+            self._append_closed(np.array(closed))
+        self.live.set_data(live[None, :])
+
+    def remove(self):
+        """Удаление коллекций свечей с осей"""
+        for block in self.blocks:
+            block.remove()
+        if self.live is not None:
+            self.live.remove()
+        self.blocks = []
+        self.live = None
+
+    def _append_closed(self, data):
+        """Дописывание закрытых свечей в последний блок, при переполнении - в новые"""
+        while len(data):
+            if not self.blocks or len(self.blocks[-1]) >= self.block_size:
+                self.blocks.append(_CandleBlock(self.ax, self.width))
+            tail = self.blocks[-1]
+            free = self.block_size - len(tail)
+            tail.set_data(np.concatenate([tail.data, data[:free]]))
+            data = data[free:]
+
+    @staticmethod
+    def _stack(dates, open_, high, low, close):
+        """Сборка колонок свечей в массив (n, 5)"""
+        return np.column_stack([
+            np.asarray(dates, dtype=float),
+            np.asarray(open_, dtype=float),
+            np.asarray(high, dtype=float),
+            np.asarray(low, dtype=float),
+            np.asarray(close, dtype=float)
+        ]).reshape(-1, 5)
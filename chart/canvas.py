@@ -0,0 +1,10 @@
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from metrics import registry
+
+
+class TimedCanvas(FigureCanvasTkAgg):
+    """Холст Tk, время каждой отрисовки которого (в т.ч. отложенной draw_idle) попадает в метрику draw"""
+
+    def draw(self):
+        with registry.timer('draw'):
+            super().draw()
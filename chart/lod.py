@@ -0,0 +1,102 @@
+import numpy as np
+
+
+def merge_pairs(rows):
+    """Объединение соседних пар свечей (n, 5): дата - середина пары, open первой,
+    close второй, high - максимум, low - минимум. Непарная последняя свеча переносится как есть.
+    """
+    pairs = len(rows) // 2
+    paired = rows[:pairs * 2].reshape(pairs, 2, 5)
+    merged = np.empty((pairs + len(rows) % 2, 5))
+    merged[:pairs, 0] = paired[:, :, 0].mean(axis=1)
+    merged[:pairs, 1] = paired[:, 0, 1]
+    merged[:pairs, 2] = paired[:, :, 2].max(axis=1)
+    merged[:pairs, 3] = paired[:, :, 3].min(axis=1)
+    merged[:pairs, 4] = paired[:, 1, 4]
+    if len(rows) % 2:
+        merged[-1] = rows[-1]
+    return merged
+
+
+class _Level:
+    """Уровень пирамиды: массив свечей (n, 5) с запасом емкости под дописывание"""
+
+    def __init__(self, rows):
+        self.data = np.empty((max(len(rows) * 2, 64), 5))
+        self.size = 0
+        self.write(0, rows)
+
+    @property
+    def rows(self):
+        return self.data[:self.size]
+
+    def write(self, start, rows):
+        """Запись свечей с позиции start, все после них отбрасывается"""
+        end = start + len(rows)
+        if end > len(self.data):
+            grown = np.empty((end * 2, 5))
+            grown[:start] = self.data[:start]
+            self.data = grown
+        self.data[start:end] = rows
+        self.size = end
+
+
+class OHLCPyramid:
+    """Пирамида уровней детализации свечей: уровень k объединяет 2**k соседних минимальных свечей.
+
+    Для видимого диапазона выбирается самый подробный уровень, у которого в окно
+    попадает не больше max_candles свечей, поэтому объем отрисовки ограничен
+    шириной оси в пикселях, а не длиной истории. Обновление последних свечей
+    пересчитывает только хвост каждого уровня - O(log n) работы на тик.
+    """
+
+    def __init__(self, min_size=256):
+        self.min_size = min_size  # Уровни строятся, пока в них больше min_size свечей
+        self.levels = []
+
+    def __len__(self):
+        return self.levels[0].size if self.levels else 0
+
+    def build(self, rows):
+        """Полное построение пирамиды по свечам (n, 5), отсортированным по дате"""
+        self.levels = [_Level(np.asarray(rows, dtype=float).reshape(-1, 5))]
+        self._extend_levels(1, 0)
+
+    def update(self, rows):
+        """Замена хвоста минимального уровня свечами rows (начиная с даты первой из них)"""
+        rows = np.asarray(rows, dtype=float).reshape(-1, 5)
+        if not self.levels:
+            self.build(rows)
+            return
+        if len(rows) == 0:
+            return
+        base = self.levels[0]
+        pos = np.searchsorted(base.rows[:, 0], rows[0, 0])
+        base.write(pos, rows)
+        self._extend_levels(1, pos)
+
+    def select(self, x_min, x_max, max_candles):
+        """Свечи видимого диапазона на подходящем уровне: (уровень, начало, конец, массив свечей)"""
+        for level_index, level in enumerate(self.levels):
+            dates = level.rows[:, 0]
+            # По одной свече за краями окна, чтобы края не обрезались при прокрутке
+            lo = max(np.searchsorted(dates, x_min) - 1, 0)
+            hi = min(np.searchsorted(dates, x_max, side='right') + 1, level.size)
+            if hi - lo <= max_candles or level_index == len(self.levels) - 1:
+                return level_index, int(lo), int(hi), level.rows[lo:hi]
+
+    def _extend_levels(self, level_index, changed_from):
+        """Пересчет уровней начиная с level_index по измененной позиции нижнего уровня"""
+        while True:
+            lower = self.levels[level_index - 1]
+            if lower.size <= self.min_size:
+                del self.levels[level_index:]
+                return
+            start = changed_from // 2
+            if level_index < len(self.levels):
+                self.levels[level_index].write(start, merge_pairs(lower.rows[start * 2:]))
+            else:
+                self.levels.append(_Level(merge_pairs(lower.rows)))
+                start = 0
+            changed_from = start
+            level_index += 1
@@ -0,0 +1,78 @@
+import numpy as np
+from chart.candles import timestamps_to_num
+
+FORECAST_COLOR = '#3498db'
+INDICATOR_COLORS = ('#f39c12', '#8e44ad', '#16a085', '#7f8c8d')
+
+
+class ForecastOverlay:
+    """Прогноз поверх свечей: линия на horizon свечей вперед или горизонтальные уровни"""
+
+    def __init__(self, ax):
+        self.ax = ax
+        self.result = None
+        self.artists = []
+
+    def show(self, result):
+        """Отображение нового результата прогноза (ForecastResult)"""
+        self.result = result
+        self.draw()
+
+    def draw(self):
+        """Перерисовка текущего прогноза (в т.ч. после ax.clear())"""
+        self._remove_artists()
+        if self.result is None:
+            return
+
+        if self.result.kind == 'levels':
+            for level in self.result.values:
+                self.artists.append(self.ax.axhline(level, color=FORECAST_COLOR, linestyle='--',
+                                                    linewidth=1, alpha=0.8))
+        else:
+            steps = np.arange(1, len(self.result.values) + 1)
+            dates = timestamps_to_num(self.result.timestamp + steps * self.result.step_ms)
+            line, = self.ax.plot(dates, self.result.values, color=FORECAST_COLOR, linewidth=1.5,
+                                 label=f"Прогноз: {self.result.method}", scalex=False, scaley=False)
+            self.artists.append(line)
+
+    def clear(self):
+        """Удаление прогноза с графика"""
+        self.result = None
+        self._remove_artists()
+
+    def _remove_artists(self):
+        for artist in self.artists:
+            if artist.axes is not None:
+                artist.remove()
+        self.artists = []
+
+
+class IndicatorOverlay:
+    """Линии индикаторов в ценах (EMA) поверх свечей.
+
+    Рисуются только переданные точки видимого диапазона; при повторных вызовах
+    обновляются данные существующих линий, новые артисты не создаются.
+    """
+
+    def __init__(self, ax):
+        self.ax = ax
+        self.lines = {}
+
+    def draw(self, timestamps, columns):
+        """Отображение колонок {название: значения} для свечей с метками timestamps"""
+        dates = timestamps_to_num(timestamps)
+        for i, (name, values) in enumerate(columns.items()):
+            line = self.lines.get(name)
+            if line is None or line.axes is None:
+                line, = self.ax.plot(dates, values, color=INDICATOR_COLORS[i % len(INDICATOR_COLORS)],
+                                     linewidth=1, alpha=0.9, label=name.upper(), scalex=False, scaley=False)
+                self.lines[name] = line
+            else:
+                line.set_data(dates, values)
+
+    def clear(self):
+        """Удаление линий индикаторов с графика"""
+        for line in self.lines.values():
+            if line.axes is not None:
+                line.remove()
+        self.lines = {}
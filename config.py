@@ -2,18 +2,76 @@ from datetime import datetime
 
 # Константы для работы с API Bybit
 BYBIT_API_URL = "https://api.bybit.com"
+BYBIT_WS_URL = "wss://stream.bybit.com/v5/public"  # + /spot или /linear
 SYMBOL = "BTCUSDT"  # Торговая пара
 INTERVAL = 1         # 1-минутные свечи (в минутах)
 MAX_RETRIES = 3      # Максимальное количество попыток при ошибках
 REQUEST_DELAY = 1    # Задержка между запросами в секундах
 CATEGORY = "spot"    # Тип рынка (spot/linear)
+WATCHLIST = [        # Отслеживаемые инструменты (категория, символ); SYMBOL/CATEGORY - открытый при запуске
+    ("spot", "BTCUSDT"),
+    ("spot", "ETHUSDT"),
+    ("spot", "SOLUSDT"),
+    ("spot", "XRPUSDT"),
+    ("linear", "BTCUSDT"),
+    ("linear", "ETHUSDT"),
+]
+CANDLES_PER_REQUEST = 1000  # Максимум свечей в одном ответе /v5/market/kline
+FETCH_WORKERS = 8    # Количество параллельных запросов при загрузке истории
+WATCHLIST_POLL_INTERVAL = 20  # Период резервного опроса REST (сек), пока стрим категории не подключен
+BUS_POLL_MS = 50      # Период разбора очереди данных главным потоком (мс)
+STATUS_FRAME_MS = 16  # Минимальный интервал обновления статус бара при наведении (~60 кадров/с)
+BUS_MAX_EVENTS = 10000  # Емкость очереди данных от фоновых потоков
+BUS_PUT_TIMEOUT = 1   # Сколько поток ждет места в переполненной очереди (сек)
+RATE_LIMIT_REQUESTS = 600  # Лимит Bybit: 600 запросов за 5 секунд с одного IP
+RATE_LIMIT_WINDOW = 5      # Окно лимита в секундах
+WS_PING_INTERVAL = 20      # Интервал ping для WebSocket в секундах
+WS_RECONNECT_DELAY = 1     # Начальная задержка переподключения WebSocket в секундах
+WS_TOPICS_PER_REQUEST = 10 # Максимум топиков в одном запросе подписки (ограничение Bybit для spot)
 
 # Параметры данных
 HISTORY_HOURS = 24   # Сколько часов данных загружать (2 дня)
 FORECAST_PERIODS = 60 # Прогноз на 60 минут
+FORECAST_WORKERS = 2  # Количество процессов для расчета прогнозов
+FORECAST_CACHE_SIZE = 64  # Сколько прогнозов (с обученными моделями) держать в кэше
+FORECAST_REFIT_EVERY = 60  # Через сколько новых свечей дообучаемая модель переобучается полностью
+FORECAST_DRIFT_THRESHOLD = 25  # Порог теста Пейджа-Хинкли на ошибках прогноза (сдвиг -> полное переобучение)
 TIMEREGION = 3       # Часовой пояс, для смещения UTS-0
+CANDLE_BUFFER_CAPACITY = 7 * 24 * 60  # Емкость буфера свечей в памяти (неделя минутных свечей)
+CANDLE_VALUE_DTYPE = "float64"  # Тип цен и объемов в памяти: "float32" - вдвое меньше памяти (~7 значащих цифр)
+CANDLE_MEMORY_BUDGET_MB = 3  # Память на свечи инструмента (с таймфреймами и индикаторами), старые - только в хранилище
+LOD_PIXELS_PER_CANDLE = 3  # Минимальная ширина свечи в пикселях, более мелкие объединяются
+INDICATOR_EMA_SPANS = (12, 26)  # Периоды EMA (линии на графике и признаки моделей)
+INDICATOR_VOLATILITY_WINDOW = 20  # Окно волатильности доходностей
+INDICATOR_RSI_PERIOD = 14
+INDICATOR_VOLUME_SPAN = 20  # Период EMA объема для отношения объема к среднему
+
+# Таймфреймы графика: подпись -> длительность свечи в минутах
+TIMEFRAMES = {
+    "1 минута": 1,
+    "5 минут": 5,
+    "15 минут": 15,
+    "30 минут": 30,
+    "1 час": 60,
+    "4 часа": 240,
+    "1 день": 1440,
+}
 
 # Сохранения данных
 DATA_SAVE_PATH = "saved_data/"
+CANDLE_STORE_PATH = f"{DATA_SAVE_PATH}candles/"  # Локальное хранилище свечей по дням
+FORECAST_CACHE_PATH = f"{DATA_SAVE_PATH}forecasts/"  # Кэш прогнозов на диске (None - только в памяти)
 RAW_DATA_FILE = f"{DATA_SAVE_PATH}raw_{SYMBOL}_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
-PROCESSED_DATA_FILE = f"{DATA_SAVE_PATH}processed_{SYMBOL}_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
\ No newline at end of file
+PROCESSED_DATA_FILE = f"{DATA_SAVE_PATH}processed_{SYMBOL}_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
+
+# Воспроизведение записанных свечей вместо биржи (data/replay.py): нагрузочные проверки, разбор событий рынка
+REPLAY_SOURCE = None  # None - живые данные, "store" - локальное хранилище, путь - запись tools.fake_bybit_rest record
+REPLAY_SPEED = 60     # Множитель скорости (1-1000): 60 - минутная свеча в секунду
+REPLAY_HISTORY_HOURS = 6  # Начало записи, загружаемое сразу как история; остальное воспроизводится по свече
+REPLAY_STORE_HOURS = 48   # Сколько последних часов хранилища воспроизводить (REPLAY_SOURCE = "store")
+
+# Метрики производительности (metrics.py)
+METRICS_LOG_PATH = None  # Периодический JSON-лог снимков (например, f"{DATA_SAVE_PATH}metrics.jsonl"; None - не писать)
+METRICS_LOG_INTERVAL = 60  # Период записи снимка в лог (сек)
+METRICS_PORT = None        # Порт локального адреса /metrics (например, 9108; None - выключен)
+METRICS_OVERLAY_MS = 1000  # Период обновления отладочной строки метрик в статус баре (мс)
\ No newline at end of file
@@ -0,0 +1 @@
+# Корень репозитория в sys.path: тесты импортируют модули приложения (config, data, forecast) как в main.py
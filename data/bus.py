@@ -0,0 +1,97 @@
+import queue
+from collections import namedtuple
+import numpy as np
+from config import BUS_MAX_EVENTS, BUS_PUT_TIMEOUT
+from metrics import registry
+
+# Пачка свечей инструмента key: словарь колонок (массивы только для чтения).
+# history=True - первоначальная история, после нее инструмент считается загруженным;
+# backfill=True - догрузка пропуска после переподключения (columns может быть None)
+CandleBatch = namedtuple('CandleBatch', ['key', 'columns', 'history', 'backfill'], defaults=[False])
+
+# Свечи инструмента из локального хранилища, показываемые до загрузки полной истории
+Preview = namedtuple('Preview', ['key', 'columns'])
+
+# Начало догрузки пропуска инструмента key: свечи стрима придерживаются до пачки с backfill=True
+Hold = namedtuple('Hold', ['key'])
+
+# Вызов func(*args) в главном потоке (результаты прогнозов, сообщения статуса)
+Call = namedtuple('Call', ['func', 'args'])
+
+
+def frozen_columns(df, names):
+    """Колонки DataFrame (или структурированного массива) как массивы только для чтения - пачку нельзя изменить после публикации"""
+    columns = {}
+    for name in names:
+        column = np.array(df[name])
+        column.flags.writeable = False
+        columns[name] = column
+    return columns
+
+
+def coalesce_columns(batches):
+    """Объединение нескольких пачек одного инструмента в одну: по времени, для повторяющихся
+    свечей остается последняя версия (правки формирующейся свечи схлопываются в одну)
+    """
+    if len(batches) == 1:
+        return batches[0]
+    names = list(batches[0])
+    merged = {name: np.concatenate([batch[name] for batch in batches]) for name in names}
+    ts = merged['timestamp']
+    # Стабильная сортировка: среди одинаковых меток последней остается самая свежая правка
+    order = np.argsort(ts, kind='stable')
+    ts = ts[order]
+    keep = order[np.append(ts[1:] != ts[:-1], True)]
+    return {name: column[keep] for name, column in merged.items()}
+
+
+def essential(event):
+    """Событие, которое нельзя отбросить при переполнении очереди"""
+    if isinstance(event, (Preview, Hold)):
+        return True
+    return isinstance(event, CandleBatch) and (event.history or event.backfill)
+
+
+class DataBus:
+    """Очередь событий от фоновых потоков (стримы, REST, загрузка истории, прогнозы) к главному потоку Tk.
+
+    Потоки только публикуют неизменяемые события и не трогают ни буферы свечей,
+    ни виджеты; главный поток периодически забирает все накопившееся (drain) и
+    применяет одним проходом. Очередь ограничена: если главный поток надолго
+    занят, публикация ждет не дольше BUS_PUT_TIMEOUT и событие отбрасывается.
+    Исключение - история, свечи из хранилища и догрузка пропуска с ее началом
+    (essential): без них инструмент не загрузится, останется с придержанными
+    свечами или применит свечи стрима поверх пропуска, поэтому они ждут места
+    в очереди сколько нужно.
+    """
+
+    def __init__(self, maxsize=BUS_MAX_EVENTS):
+        self.queue = queue.Queue(maxsize)
+        self.dropped = 0
+
+    def publish(self, event):
+        if essential(event):
+            self.queue.put(event)
+            return True
+        try:
+            self.queue.put(event, timeout=BUS_PUT_TIMEOUT)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            registry.count('bus.dropped')
+            print(f"Очередь данных переполнена, событие отброшено (всего {self.dropped})")
+            return False
+
+    def call(self, func, *args):
+        """Выполнить func(*args) в главном потоке при следующем drain"""
+        return self.publish(Call(func, args))
+
+    def drain(self):
+        """Все накопившиеся события (не блокируется)"""
+        events = []
+        while True:
+            try:
+                events.append(self.queue.get_nowait())
+            except queue.Empty:
+                registry.count('bus.events', len(events))
+                return events
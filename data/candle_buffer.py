@@ -0,0 +1,164 @@
+import numpy as np
+from datetime import datetime, timedelta
+from config import CANDLE_BUFFER_CAPACITY, CANDLE_VALUE_DTYPE, TIMEREGION
+
+FIELDS = ('timestamp', 'open', 'high', 'low', 'close', 'volume', 'turnover')
+
+
+def bytes_per_candle(fields=FIELDS, dtype=CANDLE_VALUE_DTYPE):
+    """Память на одну свечу емкости CandleBuffer (массивы выделяются на 2 * capacity)"""
+    return 2 * sum(8 if name == 'timestamp' else np.dtype(dtype).itemsize for name in fields)
+
+
+class CandleBuffer:
+    """Свечи в предвыделенных массивах NumPy фиксированной емкости.
+
+    Массивы выделяются на 2 * capacity элементов, живые данные всегда лежат
+    непрерывным срезом [start:end], поэтому колонки отдаются как представления
+    без копирования. Когда срез доходит до конца массива, последние capacity
+    свечей переносятся в начало - это происходит не чаще раза на capacity
+    добавлений, так что добавление и правка последней свечи стоят O(1).
+    При переполнении вытесняются самые старые свечи.
+    Набор колонок задается fields (первая - timestamp), по умолчанию - поля свечи.
+    Время хранится как int64 (мс), остальные колонки - в dtype (float64 или float32).
+    """
+
+    def __init__(self, capacity=CANDLE_BUFFER_CAPACITY, fields=FIELDS, dtype=CANDLE_VALUE_DTYPE):
+        self.capacity = capacity
+        self.fields = fields
+        self.dtype = np.dtype(dtype)
+        self._arrays = {
+            name: np.empty(2 * capacity, dtype=np.int64 if name == 'timestamp' else self.dtype)
+            for name in fields
+        }
+        self._start = 0
+        self._end = 0
+        self.version = 0  # Увеличивается при каждом изменении данных
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def empty(self):
+        return self._end == self._start
+
+    def column(self, name):
+        """Представление колонки без копирования (только для чтения)"""
+        view = self._arrays[name][self._start:self._end]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def timestamp(self):
+        return self.column('timestamp')
+
+    @property
+    def open(self):
+        return self.column('open')
+
+    @property
+    def high(self):
+        return self.column('high')
+
+    @property
+    def low(self):
+        return self.column('low')
+
+    @property
+    def close(self):
+        return self.column('close')
+
+    @property
+    def volume(self):
+        return self.column('volume')
+
+    @property
+    def turnover(self):
+        return self.column('turnover')
+
+    @property
+    def ds(self):
+        """Время свечей с учетом часового пояса (datetime64), вычисляется по запросу"""
+        return (self.timestamp + TIMEREGION * 3600 * 1000).astype('datetime64[ms]')
+
+    @property
+    def last_timestamp(self):
+        return int(self._arrays['timestamp'][self._end - 1]) if not self.empty else None
+
+    def row(self, index):
+        """Одна свеча в виде словаря колонок с временем отображения ds"""
+        i = self._start + (index % len(self) if index < 0 else index)
+        candle = {name: self._arrays[name][i] for name in self.fields}
+        candle['ds'] = datetime(1970, 1, 1) + timedelta(milliseconds=int(candle['timestamp']) + TIMEREGION * 3600 * 1000)
+        return candle
+
+    def upsert(self, timestamp, *values):
+        """Добавление новой свечи или замена свечи с тем же временем (значения - в порядке fields).
+
+        Возвращает False, если свеча старше последней и отсутствует в буфере.
+        """
+        values = (timestamp,) + values
+        last = self.last_timestamp
+        if last is None or timestamp > last:
+            self._reserve(1)
+            i = self._end
+            self._end += 1
+        elif timestamp == last:
+            i = self._end - 1
+        else:
+            # Правка более старой свечи - двоичный поиск по времени
+            ts = self._arrays['timestamp'][self._start:self._end]
+            pos = np.searchsorted(ts, timestamp)
+            if pos == len(ts) or ts[pos] != timestamp:
+                return False
+            i = self._start + pos
+
+        for name, value in zip(self.fields, values):
+            self._arrays[name][i] = value
+        self.version += 1
+        return True
+
+    def extend(self, columns):
+        """Добавление пачки свечей (словарь колонок); свечи не новее последней правятся по одной"""
+        ts = np.asarray(columns['timestamp'], dtype=np.int64)
+        if len(ts) == 0:
+            return
+        last = self.last_timestamp
+        newer = ts > last if last is not None else np.ones(len(ts), dtype=bool)
+
+        for i in np.nonzero(~newer)[0]:
+            self.upsert(*(columns[name][i] for name in self.fields))
+
+        if newer.any():
+            values = {name: np.asarray(columns[name])[newer] for name in self.fields}
+            # Из пачки больше емкости оставляем только последние свечи
+            values = {name: column[-self.capacity:] for name, column in values.items()}
+            count = len(values['timestamp'])
+            self._reserve(count)
+            for name in self.fields:
+                self._arrays[name][self._end:self._end + count] = values[name]
+            self._end += count
+            self.version += 1
+
+    def clear(self):
+        """Удаление всех свечей (массивы остаются выделенными)"""
+        self._start = 0
+        self._end = 0
+        self.version += 1
+
+    @property
+    def nbytes(self):
+        """Выделенная под буфер память в байтах"""
+        return sum(array.nbytes for array in self._arrays.values())
+
+    def _reserve(self, count):
+        """Освобождение места под count свечей: вытеснение старых и перенос в начало массива"""
+        overflow = len(self) + count - self.capacity
+        if overflow > 0:
+            self._start += min(overflow, len(self))
+        if self._end + count > 2 * self.capacity:
+            size = len(self)
+            for array in self._arrays.values():
+                array[:size] = array[self._start:self._end]
+            self._start = 0
+            self._end = size
@@ -0,0 +1,151 @@
+import os
+import threading
+import numpy as np
+from config import CANDLE_STORE_PATH, CATEGORY, SYMBOL, INTERVAL
+from data.fetch_data import fetch_candles_range
+from data.preprocess_data import parse_kline_list
+
+# Формат записи свечи на диске
+CANDLE_DTYPE = np.dtype([
+    ('timestamp', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+    ('turnover', '<f8')
+])
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+class CandleStore:
+    """Локальное хранилище свечей: .npy файлы по дням (UTC), читаются через memory map.
+
+    Файлы лежат в {root}/{category}/{symbol}/{interval}/YYYY-MM-DD.npy,
+    внутри каждого - отсортированные по времени записи CANDLE_DTYPE без дубликатов.
+    """
+
+    def __init__(self, root=CANDLE_STORE_PATH, category=CATEGORY, symbol=SYMBOL, interval=INTERVAL):
+        self.category = category
+        self.symbol = symbol
+        self.directory = os.path.join(root, category, symbol, str(interval))
+        self.step_ms = interval * 60 * 1000
+        self.lock = threading.Lock()  # Запись идет из потоков загрузки, стрима и главного (вытеснение)
+
+    def day_path(self, day_start_ms):
+        """Путь к файлу дня, которому принадлежит момент времени"""
+        day = np.datetime64(int(day_start_ms), 'ms').astype('datetime64[D]')
+        return os.path.join(self.directory, f"{day}.npy")
+
+    def days(self, start_ms, end_ms):
+        """Начала всех дней (UTC), пересекающихся с диапазоном"""
+        first = start_ms - start_ms % DAY_MS
+        return range(first, end_ms + 1, DAY_MS)
+
+    def read(self, start_ms, end_ms):
+        """Записи за диапазон [start_ms, end_ms] в виде массива CANDLE_DTYPE"""
+        parts = []
+        for day in self.days(start_ms, end_ms):
+            path = self.day_path(day)
+            if not os.path.exists(path):
+                continue
+            records = np.load(path, mmap_mode='r')
+            ts = records['timestamp']
+            lo = np.searchsorted(ts, start_ms, side='left')
+            hi = np.searchsorted(ts, end_ms, side='right')
+            if hi > lo:
+                parts.append(records[lo:hi])
+        if not parts:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        return np.concatenate(parts)
+
+    def write(self, records):
+        """Запись свечей (массив CANDLE_DTYPE) с объединением по дням, новые значения заменяют старые"""
+        if len(records) == 0:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        days = records['timestamp'] - records['timestamp'] % DAY_MS
+        with self.lock:
+            for day in np.unique(days):
+                path = self.day_path(day)
+                chunk = records[days == day]
+                if os.path.exists(path):
+                    chunk = np.concatenate([np.load(path), chunk])
+                chunk = deduplicate(chunk)
+
+                # Атомарная замена файла, чтобы не оставить поврежденный день при сбое
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    np.save(f, chunk)
+                os.replace(tmp_path, path)
+
+    def bounds(self):
+        """Время первой и последней сохраненной свечи или None, если хранилище пусто"""
+        if not os.path.isdir(self.directory):
+            return None
+        files = sorted(name for name in os.listdir(self.directory) if name.endswith('.npy'))
+        if not files:
+            return None
+        first = np.load(os.path.join(self.directory, files[0]), mmap_mode='r')['timestamp']
+        last = np.load(os.path.join(self.directory, files[-1]), mmap_mode='r')['timestamp']
+        return int(first[0]), int(last[-1])
+
+    def missing_ranges(self, start_ms, end_ms):
+        """Диапазоны [start, end] внутри запрошенного, для которых в хранилище нет свечей"""
+        start_ms -= start_ms % self.step_ms
+        ts = self.read(start_ms, end_ms)['timestamp']
+        # Границы-ограничители: свеча перед началом и после конца диапазона
+        bounds = np.concatenate([[start_ms - self.step_ms], ts, [end_ms - end_ms % self.step_ms + self.step_ms]])
+        gaps = np.nonzero(np.diff(bounds) > self.step_ms)[0]
+        return [(int(bounds[i] + self.step_ms), int(min(bounds[i + 1] - self.step_ms, end_ms))) for i in gaps]
+
+
+def deduplicate(records):
+    """Сортировка по времени и удаление дубликатов (остается последняя запись)"""
+    order = np.argsort(records['timestamp'], kind='stable')
+    records = records[order]
+    ts = records['timestamp']
+    keep = np.append(ts[1:] != ts[:-1], True)
+    return records[keep]
+
+
+def records_from_columns(columns):
+    """Преобразование словаря колонок свечей в массив CANDLE_DTYPE"""
+    records = np.empty(len(columns['timestamp']), dtype=CANDLE_DTYPE)
+    for name in CANDLE_DTYPE.names:
+        records[name] = columns[name]
+    return records
+
+
+def records_from_rows(rows):
+    """Преобразование строк result.list Bybit в массив CANDLE_DTYPE"""
+    return records_from_columns(parse_kline_list(rows))
+
+
+def closed_candles(records, now_ms, interval=INTERVAL):
+    """Только закрытые свечи - формирующуюся последнюю не сохраняем"""
+    return records[records['timestamp'] + interval * 60 * 1000 <= now_ms]
+
+
+def load_history(store, start_ms, end_ms, concurrent=True, verbose=True):
+    """Свечи за диапазон (массив CANDLE_DTYPE) из хранилища с догрузкой с биржи только отсутствующих участков.
+
+    Закрытые свечи из догруженных участков сохраняются в хранилище,
+    формирующаяся последняя свеча возвращается, но не сохраняется.
+    """
+    start_ms -= start_ms % store.step_ms
+    fresh = []
+    for range_start, range_end in store.missing_ranges(start_ms, end_ms):
+        rows = fetch_candles_range(range_start, range_end, concurrent=concurrent,
+                                   symbol=store.symbol, category=store.category, verbose=verbose)
+        if rows:
+            records = records_from_rows(rows)
+            store.write(closed_candles(records, end_ms))
+            fresh.append(records)
+
+    records = deduplicate(np.concatenate([store.read(start_ms, end_ms)] + fresh))
+    records = records[records['timestamp'] >= start_ms]
+    if verbose:
+        print(f"\n{store.symbol}: всего свечей {len(records)}, догружено с биржи: {sum(len(r) for r in fresh)}")
+    return records
@@ -0,0 +1,63 @@
+"""Разбор очереди данных в главном потоке без привязки к окну.
+
+Свечи из событий DataBus применяются к буферам инструментов здесь; объект
+view (окно приложения или график нагрузочной проверки) получает только
+уведомления для отрисовки:
+    on_preview(instrument) - в буфер добавлены свечи из хранилища;
+    on_history(instrument) - загружена история;
+    on_update(instrument, changed) - добавлены или изменены свечи changed.
+"""
+from data.bus import Call, Hold, Preview, coalesce_columns
+from metrics import registry
+
+
+def dispatch_events(bus, watchlist, view):
+    """Все накопившиеся события очереди.
+
+    Пачки свечей одного инструмента, накопившиеся с прошлого прохода,
+    объединяются в одну, и view обновляется не больше одного раза за проход.
+    Ошибка в одном событии или инструменте не отменяет обработку остальных.
+    """
+    batches = {}
+    events = bus.drain()
+    registry.gauge('bus.depth', len(events))
+    for event in events:
+        try:
+            handle_event(event, watchlist, view, batches)
+        except Exception as e:
+            print(f"Ошибка обработки события {type(event).__name__}: {str(e)}")
+
+    for key, columns in batches.items():
+        try:
+            apply_batch(watchlist, view, watchlist.get(key), coalesce_columns(columns))
+        except Exception as e:
+            print(f"Ошибка обработки свечей {key[1]} ({key[0]}): {str(e)}")
+
+
+def handle_event(event, watchlist, view, batches):
+    """Одно событие очереди; пачки свечей стрима и REST собираются в batches по инструментам"""
+    if isinstance(event, Call):
+        event.func(*event.args)
+    elif isinstance(event, Hold):
+        watchlist.get(event.key).hold()
+    elif isinstance(event, Preview):
+        instrument = watchlist.get(event.key)
+        if instrument.preview(event.columns):
+            view.on_preview(instrument)
+    elif event.history:
+        instrument = watchlist.get(event.key)
+        instrument.apply(event.columns, history=True)
+        view.on_history(instrument)
+    elif event.backfill:
+        # Пропуск после переподключения догружен - применяется вместе с придержанными свечами стрима
+        apply_batch(watchlist, view, watchlist.get(event.key), event.columns, backfill=True)
+    else:
+        batches.setdefault(event.key, []).append(event.columns)
+
+
+def apply_batch(watchlist, view, instrument, columns, backfill=False):
+    changed = instrument.apply(columns, backfill=backfill)
+    if changed is None:
+        return
+    watchlist.applied(instrument, changed)
+    view.on_update(instrument, changed)
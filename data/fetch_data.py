@@ -1,128 +1,147 @@
 import requests
-import pandas as pd
-from datetime import datetime, timedelta
-from config import BYBIT_API_URL, SYMBOL, INTERVAL, HISTORY_HOURS, CATEGORY, MAX_RETRIES, REQUEST_DELAY
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from config import (BYBIT_API_URL, SYMBOL, INTERVAL, CATEGORY, MAX_RETRIES, REQUEST_DELAY,
+                    CANDLES_PER_REQUEST, FETCH_WORKERS, RATE_LIMIT_REQUESTS, RATE_LIMIT_WINDOW)
+from data.rate_limit import TokenBucket
+from metrics import registry
 import sys
+import threading
 import time
-import math
-
-def fetch_bybit_candles():
-    end_time = datetime.now().replace(microsecond=0)
-    start_time = end_time - timedelta(hours=HISTORY_HOURS)
-    total_minutes = HISTORY_HOURS * 60
-    
-    # Рассчитаем необходимое количество запросов
-    candles_per_request = 200
-    num_requests = math.ceil(total_minutes / candles_per_request)
-    
-    all_candles = []
-    loaded = 0
-    print(f"Загрузка данных {SYMBOL} ({HISTORY_HOURS} часов = {total_minutes} минут)")
-    print(f"Требуется запросов: {num_requests}")
-    
-    # Рассчитаем временные интервалы для каждого запроса
-    time_step = timedelta(minutes=candles_per_request)
-    current_start = start_time
-    
-    for i in range(num_requests):
-        # Рассчитаем конечное время для текущего запроса
-        current_end = min(current_start + time_step, end_time)
-        
-        # Преобразуем время в миллисекунды
-        start_ms = int(current_start.timestamp() * 1000)
-        end_ms = int(current_end.timestamp() * 1000)
-        
-        # Подготовим параметры запроса
-        params = {
-            'category': CATEGORY,
-            'symbol': SYMBOL,
-            'interval': str(INTERVAL),
-            'start': start_ms,
-            'end': end_ms,
-            'limit': candles_per_request
-        }
-        
-        # Выполняем запрос с повторными попытками
-        for attempt in range(MAX_RETRIES):
-            try:
-                response = requests.get(
-                    f"{BYBIT_API_URL}/v5/market/kline",
-                    params=params,
-                    timeout=10
-                )
-                
-                if response.status_code != 200:
-                    raise Exception(f"API Error {response.status_code}: {response.text}")
-                
-                data = response.json().get('result', {}).get('list', [])
-                if not data:
-                    break
-                
-                all_candles.extend(data)
-                loaded += len(data)
-                
-                # Обновляем прогресс
-                progress = min(100, int(loaded / total_minutes * 100))
-                sys.stdout.write(f"\rЗапрос {i+1}/{num_requests} | Прогресс: {progress}% ({loaded}/{total_minutes})")
-                sys.stdout.flush()
-                break
-                
-            except Exception as e:
-                print(f"\nОшибка при запросе: {str(e)}")
-                if attempt < MAX_RETRIES - 1:
-                    print(f"Повторная попытка {attempt+1}/{MAX_RETRIES} через 2 сек...")
-                    time.sleep(2)
-                else:
-                    print("Превышено максимальное количество попыток. Пропускаем этот интервал.")
-                    break
-        
-        # Переходим к следующему интервалу
-        current_start = current_end
-        if current_start >= end_time:
-            break
-            
-        # Задержка между запросами
-        time.sleep(REQUEST_DELAY)
-    
-    # Обработка случая, когда загружено больше данных, чем нужно
-    if loaded > total_minutes:
-        all_candles = all_candles[:total_minutes]
-        loaded = total_minutes
-    
-    sys.stdout.write(f"\rЗагрузка завершена! Загружено минут: {loaded}/{total_minutes}\n")
-    
-    # Создаем DataFrame
-    df = pd.DataFrame(all_candles, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume', 'turnover'])
-    return df
-
-def fetch_recent_candles(last_timestamp):
-    """Загрузка только последних свечей с биржи"""
-    # Рассчитываем время начала - последняя свеча + 1 минута
-    start_time = datetime.fromtimestamp(last_timestamp / 1000)
-    end_time = datetime.now()
-    
+
+KLINE_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'turnover']
+
+# Общий лимит запросов к API для всех потоков
+rate_limiter = TokenBucket(RATE_LIMIT_REQUESTS / RATE_LIMIT_WINDOW)
+
+_session = None
+_session_lock = threading.Lock()
+_executor = None
+# Запросов одновременно - не больше соединений в пуле сессии, откуда бы они ни шли
+_request_slots = threading.BoundedSemaphore(FETCH_WORKERS)
+
+
+def get_session():
+    """Общая HTTP-сессия с пулом соединений (keep-alive) на все потоки загрузки"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=FETCH_WORKERS)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def get_executor():
+    """Общий пул потоков загрузки окон: история нескольких инструментов не умножает число потоков"""
+    global _executor
+    with _session_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS)
+        return _executor
+
+
+def timed_get(params):
+    """Запрос /v5/market/kline с учетом в метриках: время ответа (fetch), запросы, байты"""
+    with _request_slots, registry.timer('fetch'):
+        response = get_session().get(f"{BYBIT_API_URL}/v5/market/kline", params=params, timeout=10)
+    registry.count('fetch.requests')
+    registry.count('fetch.bytes', len(response.content))
+    return response
+
+
+def fetch_window(start_ms, end_ms, limit=CANDLES_PER_REQUEST, symbol=SYMBOL, category=CATEGORY):
+    """Загрузка одного окна свечей с повторными попытками, возвращает список строк API"""
     params = {
-        'category': CATEGORY,
-        'symbol': SYMBOL,
+        'category': category,
+        'symbol': symbol,
         'interval': str(INTERVAL),
-        'start': int(start_time.timestamp() * 1000),
-        'end': int(end_time.timestamp() * 1000),
-        'limit': 200  # Максимальное количество свечей за запрос
+        'start': start_ms,
+        'end': end_ms,
+        'limit': limit
     }
-    
-    try:
-        response = requests.get(
-            f"{BYBIT_API_URL}/v5/market/kline",
-            params=params,
-            timeout=10
-        )
-        
-        if response.status_code != 200:
-            raise Exception(f"API Error {response.status_code}: {response.text}")
-        
-        data = response.json().get('result', {}).get('list', [])
-        return pd.DataFrame(data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume', 'turnover'])
-        
-    except Exception as e:
-        print(f"Ошибка при загрузке новых свечей: {str(e)}")
-        return pd.DataFrame()
\ No newline at end of file
+
+    for attempt in range(MAX_RETRIES):
+        try:
+            if attempt:
+                registry.count('fetch.retries')
+            rate_limiter.acquire()
+            response = timed_get(params)
+
+            if response.status_code != 200:
+                raise Exception(f"API Error {response.status_code}: {response.text}")
+
+            data = response.json().get('result', {}).get('list', [])
+            registry.count('fetch.candles', len(data))
+            return data
+
+        except Exception as e:
+            registry.count('fetch.errors')
+            print(f"\nОшибка при запросе {symbol}: {str(e)}")
+            if attempt < MAX_RETRIES - 1:
+                print(f"Повторная попытка {attempt+1}/{MAX_RETRIES} через 2 сек...")
+                time.sleep(2)
+            else:
+                print("Превышено максимальное количество попыток. Пропускаем этот интервал.")
+    return []
+
+
+def split_windows(start_ms, end_ms, limit=CANDLES_PER_REQUEST):
+    """Разбиение диапазона на непересекающиеся окна по limit свечей"""
+    step_ms = INTERVAL * 60 * 1000
+    windows = []
+    current = start_ms - start_ms % step_ms  # Выравнивание по началу свечи
+    while current <= end_ms:
+        window_end = min(current + (limit - 1) * step_ms, end_ms)
+        windows.append((current, window_end))
+        current = window_end + step_ms
+    return windows
+
+
+def fetch_candles_range(start_ms, end_ms, concurrent=True, symbol=SYMBOL, category=CATEGORY, verbose=True):
+    """Загрузка свечей за диапазон [start_ms, end_ms] окнами, параллельно или последовательно.
+
+    Окна собираются обратно в порядке времени, дубликаты на границах окон удаляются.
+    verbose=False - без вывода прогресса (частые догрузки пропусков).
+    """
+    windows = split_windows(start_ms, end_ms)
+    total_minutes = (end_ms - start_ms) // (INTERVAL * 60 * 1000) + 1
+    if verbose:
+        print(f"Требуется запросов: {len(windows)}")
+
+    results = [None] * len(windows)
+    progress_lock = threading.Lock()
+    state = {'done': 0, 'loaded': 0}
+
+    def load(index):
+        data = fetch_window(*windows[index], symbol=symbol, category=category)
+        results[index] = data
+
+        if not verbose:
+            return
+        # Обновляем прогресс
+        with progress_lock:
+            state['done'] += 1
+            state['loaded'] += len(data)
+            progress = min(100, int(state['loaded'] / total_minutes * 100))
+            sys.stdout.write(f"\rЗапрос {state['done']}/{len(windows)} | Прогресс: {progress}% "
+                             f"({state['loaded']}/{total_minutes})")
+            sys.stdout.flush()
+
+    if concurrent and len(windows) > 1:
+        list(get_executor().map(load, range(len(windows))))
+    else:
+        for i in range(len(windows)):
+            load(i)
+            # Задержка между запросами
+            if i < len(windows) - 1:
+                time.sleep(REQUEST_DELAY)
+
+    # Bybit отдает свечи окна от новых к старым - разворачиваем каждое окно
+    all_candles = {}
+    for data in results:
+        for row in reversed(data):
+            all_candles[row[0]] = row
+    return list(all_candles.values())
+
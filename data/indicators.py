@@ -0,0 +1,215 @@
+import copy
+import numpy as np
+from config import INDICATOR_EMA_SPANS, INDICATOR_VOLATILITY_WINDOW, INDICATOR_RSI_PERIOD, INDICATOR_VOLUME_SPAN
+from data.candle_buffer import CandleBuffer
+
+# Все индикаторы считаются ядрами двух видов: extend() по пачке значений работает
+# векторно и продолжает состояние с места остановки, поэтому полный расчет по истории
+# и дообновление одной новой свечой - один и тот же код, без пересчета окон pandas
+
+
+def ema_filter(values, alpha, initial=None):
+    """Экспоненциальное сглаживание y[t] = (1 - alpha) * y[t-1] + alpha * x[t] без цикла по элементам.
+
+    y[t] = beta**t * (beta * y[-1] + alpha * sum(x[i] * beta**-i)), beta = 1 - alpha.
+    Множители beta**-i быстро растут, поэтому ряд считается блоками, в пределах
+    которых они остаются в диапазоне float64. initial - значение перед первым
+    элементом (None - ряд начинается с x[0]).
+    """
+    values = np.asarray(values, dtype=float)
+    result = np.empty(len(values))
+    if len(values) == 0:
+        return result
+    beta = 1.0 - alpha
+    previous = values[0] if initial is None else initial
+    if beta == 0:
+        return values.copy()
+
+    block = max(int(200 / -np.log10(beta)), 1) if beta < 1 else len(values)
+    for start in range(0, len(values), block):
+        chunk = values[start:start + block]
+        powers = beta ** np.arange(len(chunk))
+        result[start:start + len(chunk)] = powers * (beta * previous + alpha * np.cumsum(chunk / powers))
+        previous = result[start + len(chunk) - 1]
+    return result
+
+
+class Ema:
+    """Экспоненциальная средняя с периодом span (или коэффициентом alpha)"""
+
+    def __init__(self, span=None, alpha=None):
+        self.alpha = alpha if alpha is not None else 2.0 / (span + 1)
+        self.value = None
+
+    def extend(self, values):
+        result = ema_filter(values, self.alpha, self.value)
+        if len(result):
+            self.value = result[-1]
+        return result
+
+
+class RollingStd:
+    """Скользящее СКО по окну window (NaN, пока окно не заполнено).
+
+    Суммы и суммы квадратов окна берутся разностями кумулятивных сумм по новой
+    пачке и хвосту из window - 1 прежних значений.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.tail = np.empty(0)
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=float)
+        x = np.concatenate((self.tail, values))
+        sums = np.concatenate(([0.0], np.cumsum(x)))
+        squares = np.concatenate(([0.0], np.cumsum(x * x)))
+
+        end = np.arange(len(self.tail), len(x)) + 1
+        begin = end - self.window
+        full = begin >= 0
+        result = np.full(len(values), np.nan)
+        n = self.window
+        total = sums[end[full]] - sums[begin[full]]
+        variance = (squares[end[full]] - squares[begin[full]] - total * total / n) / n
+        result[full] = np.sqrt(np.maximum(variance, 0.0))
+
+        self.tail = x[-(self.window - 1):] if self.window > 1 else x[:0]
+        return result
+
+
+class Rsi:
+    """RSI Уайлдера: сглаживание приростов и падений цены с alpha = 1 / period"""
+
+    def __init__(self, period):
+        self.gains = Ema(alpha=1.0 / period)
+        self.losses = Ema(alpha=1.0 / period)
+        self.last = None
+
+    def extend(self, close):
+        close = np.asarray(close, dtype=float)
+        if len(close) == 0:
+            return np.empty(0)
+        previous = close[0] if self.last is None else self.last
+        change = np.diff(close, prepend=previous)
+        self.last = close[-1]
+
+        gains = self.gains.extend(np.maximum(change, 0.0))
+        losses = self.losses.extend(np.maximum(-change, 0.0))
+        total = gains + losses
+        # Без движения цены RSI нейтральный
+        return np.divide(100.0 * gains, total, out=np.full(len(close), 50.0), where=total > 0)
+
+
+class Indicators:
+    """Набор индикаторов свечного ряда с состоянием для потокового обновления.
+
+    extend(close, volume) возвращает словарь колонок для новых свечей:
+    return (лог-доходность), volatility (СКО доходностей), ema_<span>, rsi и,
+    если переданы объемы, volume_ratio (объем к его EMA). Одна новая свеча - O(1).
+    """
+
+    def __init__(self, ema_spans=INDICATOR_EMA_SPANS, volatility_window=INDICATOR_VOLATILITY_WINDOW,
+                 rsi_period=INDICATOR_RSI_PERIOD, volume_span=INDICATOR_VOLUME_SPAN):
+        self.emas = {f"ema_{span}": Ema(span) for span in ema_spans}
+        self.volatility = RollingStd(volatility_window)
+        self.rsi = Rsi(rsi_period)
+        self.volume = Ema(volume_span)
+        self.last_close = None
+
+    def names(self, with_volume=True):
+        """Названия колонок в порядке extend()"""
+        names = ['return', 'volatility'] + list(self.emas) + ['rsi']
+        return names + ['volume_ratio'] if with_volume else names
+
+    def extend(self, close, volume=None):
+        close = np.asarray(close, dtype=float)
+        if len(close) == 0:
+            return {name: np.empty(0) for name in self.names(volume is not None)}
+
+        # Первая доходность ряда неизвестна - считаем ее нулевой
+        previous = close[0] if self.last_close is None else self.last_close
+        returns = np.diff(np.log(close), prepend=np.log(previous))
+        self.last_close = close[-1]
+
+        values = {'return': returns, 'volatility': self.volatility.extend(returns)}
+        for name, ema in self.emas.items():
+            values[name] = ema.extend(close)
+        values['rsi'] = self.rsi.extend(close)
+        if volume is not None:
+            volume = np.asarray(volume, dtype=float)
+            average = self.volume.extend(volume)
+            values['volume_ratio'] = np.divide(volume, average, out=np.ones(len(volume)), where=average > 0)
+        return values
+
+    def copy(self):
+        """Независимая копия состояния (для рекурсивного прогноза по предсказанным ценам)"""
+        return copy.deepcopy(self)
+
+
+def indicator_features(values, close, scale=1.0):
+    """Стационарные признаки для моделей из колонок Indicators (n, k).
+
+    Волатильность и отклонение цены от EMA - в единицах scale (СКО доходностей),
+    RSI переводится в [-1, 1], отношение объема логарифмируется.
+    """
+    close = np.asarray(close, dtype=float)
+    columns = [values['volatility'] / scale]
+    columns += [np.log(close / values[name]) / scale for name in values if name.startswith('ema_')]
+    columns.append(values['rsi'] / 50.0 - 1.0)
+    if 'volume_ratio' in values:
+        columns.append(np.log(values['volume_ratio']))
+    return np.column_stack(columns)
+
+
+class IndicatorSeries:
+    """Индикаторы, выровненные со свечами буфера и досчитываемые по его версии.
+
+    Значения хранятся в CandleBuffer с колонками индикаторов. Состояние ядер
+    фиксируется после предпоследней свечи, поэтому правки формирующейся свечи и
+    новые свечи пересчитывают только хвост ряда - O(1) на тик.
+    """
+
+    def __init__(self, source, indicators_factory=Indicators):
+        self.source = source
+        self.factory = indicators_factory
+        self.reset()
+
+    def reset(self):
+        names = self.factory().names()
+        self.values = CandleBuffer(capacity=self.source.capacity, fields=('timestamp',) + tuple(names),
+                                   dtype=self.source.dtype)
+        self.committed = None  # (метка последней учтенной закрытой свечи, состояние после нее)
+        self._synced = None
+
+    def column(self, name):
+        """Колонка индикатора, выровненная с source (после sync)"""
+        self.sync()
+        return self.values.column(name)
+
+    def sync(self):
+        if self._synced == self.source.version:
+            return
+        ts = self.source.timestamp
+        start = 0
+        if self.committed is not None:
+            pos = np.searchsorted(ts, self.committed[0])
+            if pos < len(ts) and ts[pos] == self.committed[0]:
+                start = pos + 1
+            else:
+                # История сдвинулась дальше учтенной свечи - считаем заново
+                self.reset()
+
+        state = self.committed[1].copy() if self.committed is not None else self.factory()
+        close = self.source.close[start:]
+        volume = self.source.volume[start:]
+        if len(close) > 1:
+            head = state.extend(close[:-1], volume[:-1])
+            self.committed = (int(ts[-2]), state.copy())
+            tail = state.extend(close[-1:], volume[-1:])
+            columns = {name: np.concatenate((head[name], tail[name])) for name in head}
+        else:
+            columns = state.extend(close, volume)
+        columns['timestamp'] = ts[start:]
+        self.values.extend(columns)
+        self._synced = self.source.version
@@ -1,29 +1,68 @@
+import numpy as np
 import pandas as pd
-from config import INTERVAL,TIMEREGION
+from metrics import registry
 
-def prepare_prophet_data(raw_df):
-    if raw_df.empty:
+KLINE_FIELDS = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'turnover']
+
+
+def parse_kline_list(rows):
+    """Однопроходный разбор result.list Bybit (списки строк) в типизированные колонки.
+
+    Все значения разбираются одним вызовом NumPy в float64 (метка времени в мс
+    меньше 2**53 и переводится в int64 без потерь). Bybit отдает свечи от новых
+    к старым - результат разворачивается и, если порядок нарушен, сортируется.
+    Возвращает словарь колонок: timestamp (int64) и цены/объемы (float64).
+    """
+    values = np.array(rows, dtype=np.float64).reshape(-1, len(KLINE_FIELDS))
+    values = values[~np.isnan(values[:, 0])]
+
+    timestamp = values[:, 0].astype(np.int64)
+    if len(timestamp) > 1 and timestamp[0] > timestamp[-1]:
+        values = values[::-1]
+        timestamp = timestamp[::-1]
+    if np.any(timestamp[1:] < timestamp[:-1]):
+        order = np.argsort(timestamp, kind='stable')
+        values = values[order]
+        timestamp = timestamp[order]
+
+    columns = {'timestamp': timestamp}
+    for i, name in enumerate(KLINE_FIELDS[1:], start=1):
+        columns[name] = values[:, i]
+    return columns
+
+
+@registry.timed('parse')
+def parse_candles(raw_data):
+    """Свечи API (строки result.list или DataFrame из них) в компактные колонки без DataFrame.
+
+    timestamp - int64 (мс), цены и объемы - float64; время для отображения (ds)
+    не хранится и вычисляется по timestamp там, где нужно.
+    """
+    if len(raw_data) == 0:
         raise ValueError("Получен пустой DataFrame для обработки")
-    
+    registry.count('parse.candles', len(raw_data))
+
+    # Быстрый путь: списки строк API или DataFrame из них разбираются одним проходом
+    rows = raw_data[KLINE_FIELDS].to_numpy() if isinstance(raw_data, pd.DataFrame) else raw_data
+    try:
+        return parse_kline_list(rows)
+    except (ValueError, TypeError):
+        return _parse_candles_slow(pd.DataFrame(raw_data, columns=KLINE_FIELDS))
+
+
+def _parse_candles_slow(raw_df):
+    """Поколоночный разбор с заменой некорректных значений на NaN (для данных с мусором)"""
     # Сортировка по времени
     raw_df = raw_df.sort_values('timestamp')
 
     # Преобразование timestamp в числовой формат
     raw_df['timestamp'] = pd.to_numeric(raw_df['timestamp'], errors='coerce')
-    
+
     # Удаление некорректных значений timestamp
     raw_df = raw_df.dropna(subset=['timestamp'])
-    
-    # Конвертация timestamp в datetime
-    # Добавляем смещение часового пояса (TIMEREGION часов)
-    raw_df['ds'] = pd.to_datetime(
-        raw_df['timestamp'].astype('int64') // 1000 + TIMEREGION * 3600, 
-        unit='s'
-    )
 
     # Преобразование числовых колонок в float
-    numeric_cols = ['open', 'high', 'low', 'close', 'volume', 'turnover']
-    for col in numeric_cols:
-        raw_df[col] = pd.to_numeric(raw_df[col], errors='coerce')
-    
-    return raw_df[['ds','timestamp', 'open', 'high', 'low', 'close', 'volume', 'turnover']]
\ No newline at end of file
+    columns = {'timestamp': raw_df['timestamp'].to_numpy(dtype=np.int64)}
+    for col in KLINE_FIELDS[1:]:
+        columns[col] = pd.to_numeric(raw_df[col], errors='coerce').to_numpy(dtype=np.float64)
+    return columns
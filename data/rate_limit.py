@@ -0,0 +1,26 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Потокобезопасный ограничитель частоты запросов (token bucket)"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate                          # Токенов в секунду
+        self.capacity = capacity or rate          # Максимальный запас (размер всплеска)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Ожидание и списание токенов перед запросом"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
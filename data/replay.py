@@ -0,0 +1,119 @@
+"""Воспроизведение записанных свечей через тот же конвейер, что и живые данные.
+
+ReplayWatchlist заменяет биржу (REST-догрузку и WebSocket) записью: начало записи
+приходит как история, остальные свечи - по одной с ускорением speed через ту же
+очередь (DataBus), слияние, индикаторы, прогнозы и отрисовку. Так можно
+проверить приложение под нагрузкой или повторить событие рынка, не дожидаясь
+реальных минут. Отставание главного потока видно по метрике replay.lag -
+задержке от плановой отправки свечи до ее добавления в буфер.
+"""
+import threading
+import time
+from datetime import datetime
+import numpy as np
+from config import (WATCHLIST, INTERVAL, REPLAY_SOURCE, REPLAY_SPEED, REPLAY_HISTORY_HOURS, REPLAY_STORE_HOURS)
+from data.bus import CandleBatch, frozen_columns
+from data.candle_buffer import FIELDS
+from data.preprocess_data import parse_candles
+from data.watchlist import Watchlist
+from metrics import registry
+
+MAX_SPEED = 1000
+
+
+def read_recording(path):
+    """Колонки свечей из записи tools.fake_bybit_rest record (или сохраненного ответа API)"""
+    from tools.fake_bybit_rest import load_rows
+
+    return frozen_columns(parse_candles(load_rows(path)), FIELDS)
+
+
+class ReplayWatchlist(Watchlist):
+    """Инструменты списка с данными из записи вместо биржи.
+
+    source - "store" (последние REPLAY_STORE_HOURS часов локального хранилища каждого
+    инструмента) или путь к записи (одна запись воспроизводится для всех инструментов).
+    Свечи отправляются по расписанию: k-я - через k * INTERVAL минут / speed после
+    начала. Воспроизведенные свечи в хранилище не пишутся.
+    """
+
+    def __init__(self, bus, source=REPLAY_SOURCE, speed=REPLAY_SPEED, instruments=WATCHLIST, on_finished=None):
+        super().__init__(bus, instruments)
+        self.source = source
+        self.speed = min(max(speed, 1), MAX_SPEED)
+        self.interval = INTERVAL * 60 / self.speed  # Секунд между свечами
+        self.on_finished = on_finished
+        self.started = None  # Время отправки первой воспроизводимой свечи (perf_counter)
+        self.timestamps = {}  # Метки воспроизводимых свечей инструментов - для расчета задержки
+        self._thread = None
+
+    def read(self, instrument):
+        """Свечи записи инструмента (фоновый поток): колонки или None"""
+        if self.source == "store":
+            end_ms = int(datetime.now().timestamp() * 1000)
+            records = instrument.store.read(end_ms - int(REPLAY_STORE_HOURS * 3600 * 1000), end_ms)
+            return frozen_columns(records, FIELDS) if len(records) else None
+        return read_recording(self.source)
+
+    def start(self):
+        """Чтение записей и воспроизведение в фоновом потоке"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def load(self, instrument):
+        """История всех инструментов отправляется при запуске воспроизведения"""
+
+    def connected(self, instrument):
+        return self._thread is not None and self._thread.is_alive()
+
+    def applied(self, instrument, columns):
+        """Задержка от плановой отправки последней свечи пачки до ее добавления в буфер"""
+        timestamps = self.timestamps.get(instrument.key)
+        if self.started is None or timestamps is None:
+            return
+        step = np.searchsorted(timestamps, columns['timestamp'][-1])
+        if step < len(timestamps):
+            lag = time.perf_counter() - (self.started + step * self.interval)
+            registry.observe('replay.lag', max(lag, 0) * 1000)
+
+    def _run(self):
+        history_count = int(REPLAY_HISTORY_HOURS * 60 // INTERVAL)
+        replay = {}
+        for instrument in self:
+            try:
+                columns = self.read(instrument)
+            except Exception as e:
+                print(f"Ошибка чтения записи {instrument.symbol}: {str(e)}")
+                columns = None
+            if columns is None or len(columns['timestamp']) < 2:
+                self.bus.publish(CandleBatch(instrument.key, columns, True))
+                continue
+
+            # Начало записи - история, хотя бы одна свеча остается для воспроизведения
+            split = min(history_count, len(columns['timestamp']) - 1) or 1
+            self.bus.publish(CandleBatch(instrument.key, {name: column[:split] for name, column in columns.items()},
+                                         True))
+            replay[instrument.key] = {name: column[split:] for name, column in columns.items()}
+            self.timestamps[instrument.key] = replay[instrument.key]['timestamp']
+
+        steps = max((len(columns['timestamp']) for columns in replay.values()), default=0)
+        print(f"Воспроизведение x{self.speed:g}: {steps} свечей")
+        self.started = time.perf_counter()
+        for step in range(steps):
+            due = self.started + step * self.interval
+            if self._stop.wait(max(due - time.perf_counter(), 0)):
+                return
+            for key, columns in replay.items():
+                if step < len(columns['timestamp']):
+                    if self.bus.publish(CandleBatch(key, {name: column[step:step + 1]
+                                                          for name, column in columns.items()}, False)):
+                        registry.count('replay.candles')
+
+        print("Воспроизведение завершено")
+        if self.on_finished is not None:
+            self.on_finished()
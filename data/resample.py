@@ -0,0 +1,71 @@
+import numpy as np
+from data.candle_buffer import CandleBuffer, FIELDS
+
+
+def aggregate_candles(columns, minutes):
+    """Агрегация минутных свечей (словарь колонок, по возрастанию времени) в свечи по minutes минут"""
+    ts = np.asarray(columns['timestamp'])
+    if len(ts) == 0:
+        return {name: np.asarray(columns[name])[:0] for name in FIELDS}
+
+    step_ms = minutes * 60 * 1000
+    bucket = ts - ts % step_ms
+    starts = np.flatnonzero(np.concatenate(([True], bucket[1:] != bucket[:-1])))
+    ends = np.append(starts[1:], len(ts)) - 1
+
+    return {
+        'timestamp': bucket[starts],
+        'open': np.asarray(columns['open'])[starts],
+        'high': np.maximum.reduceat(columns['high'], starts),
+        'low': np.minimum.reduceat(columns['low'], starts),
+        'close': np.asarray(columns['close'])[ends],
+        'volume': np.add.reduceat(columns['volume'], starts),
+        'turnover': np.add.reduceat(columns['turnover'], starts)
+    }
+
+
+class TimeframeAggregator:
+    """Свечи старших таймфреймов, построенные из минутного буфера и закэшированные.
+
+    Буфер таймфрейма строится целиком один раз при первом обращении, дальше
+    при каждом изменении минутных данных пересчитывается только последний
+    (незакрытый) бар и добавляются новые - по минутным свечам начиная с его начала.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.cache = {}     # минуты -> CandleBuffer
+        self._synced = {}   # минуты -> версия минутного буфера на момент синхронизации
+
+    def get(self, minutes):
+        """Буфер свечей таймфрейма (для 1 минуты - сам минутный буфер)"""
+        if minutes == 1:
+            return self.source
+        if minutes not in self.cache:
+            self.cache[minutes] = CandleBuffer(capacity=max(self.source.capacity // minutes + 2, 16),
+                                               dtype=self.source.dtype)
+            self._synced[minutes] = None
+        self._sync(minutes)
+        return self.cache[minutes]
+
+    def update(self):
+        """Досчет всех закэшированных таймфреймов после поступления новых минутных свечей"""
+        for minutes in self.cache:
+            self._sync(minutes)
+
+    def reset(self):
+        """Сброс кэша (например, при полной перезагрузке минутных данных)"""
+        self.cache.clear()
+        self._synced.clear()
+
+    def _sync(self, minutes):
+        if self._synced[minutes] == self.source.version:
+            return
+        bars = self.cache[minutes]
+        ts = self.source.timestamp
+        start = 0
+        if not bars.empty:
+            start = np.searchsorted(ts, bars.last_timestamp)
+        columns = {name: self.source.column(name)[start:] for name in FIELDS}
+        bars.extend(aggregate_candles(columns, minutes))
+        self._synced[minutes] = self.source.version
@@ -0,0 +1,125 @@
+import json
+import threading
+import time
+import websocket
+from config import (BYBIT_WS_URL, SYMBOL, INTERVAL, CATEGORY, WS_PING_INTERVAL, WS_RECONNECT_DELAY,
+                    WS_TOPICS_PER_REQUEST)
+from metrics import registry
+
+
+def kline_topic(symbol=SYMBOL, interval=INTERVAL):
+    """Имя kline-топика Bybit v5"""
+    return f"kline.{interval}.{symbol}"
+
+
+def parse_kline_message(message):
+    """Разбор сообщения kline-топика: (символ, строки свечей в формате result.list REST API) или None - не свечи.
+
+    Строки разбираются в колонки тем же parse_candles, что и ответы REST, без DataFrame на сообщение.
+    """
+    payload = json.loads(message)
+    topic = payload.get('topic', '')
+    if not topic.startswith('kline.'):
+        return None
+
+    rows = [
+        [str(item['start']), item['open'], item['high'], item['low'],
+         item['close'], item['volume'], item['turnover']]
+        for item in payload.get('data', [])
+    ]
+    return topic.rsplit('.', 1)[1], rows
+
+
+class KlineStream:
+    """Потоковое получение свечей по WebSocket (Bybit v5) с автоматическим переподключением.
+
+    Одно соединение на категорию рынка: kline-топики всех symbols мультиплексируются
+    в нем. on_candles(symbol, rows) вызывается из потока стрима на каждое сообщение
+    со свечами, on_connect() - после каждого (пере)подключения, чтобы догрузить пропуск через REST.
+    """
+
+    def __init__(self, on_candles, on_connect=None, url=None, symbols=(SYMBOL,), interval=INTERVAL,
+                 category=CATEGORY, ping_interval=WS_PING_INTERVAL, reconnect_delay=WS_RECONNECT_DELAY):
+        self.on_candles = on_candles
+        self.on_connect = on_connect
+        self.url = url or f"{BYBIT_WS_URL}/{category}"
+        self.interval = interval
+        self.symbols = list(symbols)
+        self.ping_interval = ping_interval
+        self.reconnect_delay = reconnect_delay
+        self.connected = False
+        self._ws = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Запуск стрима в фоновом потоке"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Остановка стрима и закрытие соединения"""
+        self._stop.set()
+        if self._ws is not None:
+            self._ws.close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _subscribe(self, symbols):
+        # Bybit ограничивает число топиков в одном запросе подписки
+        topics = [kline_topic(symbol, self.interval) for symbol in symbols]
+        for i in range(0, len(topics), WS_TOPICS_PER_REQUEST):
+            self._ws.send(json.dumps({'op': 'subscribe', 'args': topics[i:i + WS_TOPICS_PER_REQUEST]}))
+
+    def _run(self):
+        """Цикл подключения: при обрыве переподключаемся с нарастающей задержкой"""
+        delay = self.reconnect_delay
+        while not self._stop.is_set():
+            try:
+                self._ws = websocket.create_connection(self.url, timeout=self.ping_interval)
+                self._subscribe(self.symbols)
+                self.connected = True
+                delay = self.reconnect_delay
+
+                # Догрузка свечей, пропущенных до подключения
+                if self.on_connect is not None:
+                    self.on_connect()
+
+                self._receive()
+            except Exception as e:
+                if not self._stop.is_set():
+                    registry.count('stream.disconnects')
+                    print(f"Ошибка WebSocket: {str(e)}")
+            finally:
+                self.connected = False
+                if self._ws is not None:
+                    self._ws.close()
+
+            if self._stop.wait(delay):
+                break
+            delay = min(delay * 2, 60)
+
+    def _receive(self):
+        """Чтение сообщений с ping каждые ping_interval секунд, чтобы биржа не закрыла соединение"""
+        last_ping = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                message = self._ws.recv()
+            except websocket.WebSocketTimeoutException:
+                message = None
+            else:
+                if not message:
+                    raise ConnectionError("Соединение закрыто сервером")
+
+            if time.monotonic() - last_ping >= self.ping_interval:
+                self._ws.send(json.dumps({'op': 'ping'}))
+                last_ping = time.monotonic()
+
+            if message is None:
+                continue
+            registry.count('stream.messages')
+            registry.count('stream.bytes', len(message))
+            parsed = parse_kline_message(message)
+            if parsed is not None and parsed[1]:
+                self.on_candles(*parsed)
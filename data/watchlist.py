@@ -0,0 +1,279 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from config import (WATCHLIST, HISTORY_HOURS, FETCH_WORKERS, WATCHLIST_POLL_INTERVAL, TIMEFRAMES,
+                    CANDLE_VALUE_DTYPE, CANDLE_MEMORY_BUDGET_MB)
+from data.bus import CandleBatch, Hold, Preview, coalesce_columns, frozen_columns
+from data.candle_buffer import CandleBuffer, FIELDS, bytes_per_candle
+from data.candle_store import CandleStore, load_history, records_from_columns, closed_candles
+from data.indicators import Indicators
+from data.preprocess_data import parse_candles
+from data.resample import TimeframeAggregator
+from data.stream import KlineStream
+from metrics import registry
+
+
+def budget_capacity(budget_bytes, dtype=CANDLE_VALUE_DTYPE):
+    """Емкость буфера минутных свечей, при которой инструмент укладывается в budget_bytes.
+
+    На каждую минутную свечу приходятся ее колонки, колонки индикаторов и доля
+    свечей старших таймфреймов (со своими индикаторами).
+    """
+    per_candle = bytes_per_candle(FIELDS, dtype) + bytes_per_candle(('timestamp', *Indicators().names()), dtype)
+    share = 1 + sum(1 / minutes for minutes in TIMEFRAMES.values() if minutes > 1)
+    return max(1, int(budget_bytes / (per_candle * share)))
+
+
+class Instrument:
+    """Отслеживаемый инструмент: свое хранилище, буфер минутных свечей и кэш таймфреймов"""
+
+    def __init__(self, category, symbol):
+        self.category = category
+        self.symbol = symbol
+        self.store = CandleStore(category=category, symbol=symbol)
+        # Закрытые свечи уже сохранены (prepare, load_history) - вытесненные из памяти остаются в хранилище
+        self.candles = CandleBuffer(capacity=budget_capacity(CANDLE_MEMORY_BUDGET_MB * 2 ** 20))
+        self.timeframes = TimeframeAggregator(self.candles)
+        self.last_timestamp = None  # Время последней полученной свечи
+        self.loaded = False         # История загружена - можно принимать новые свечи
+        self.loading = False        # История загружается в фоне
+        self.previewed = False      # В буфере свечи из хранилища, показанные до загрузки истории
+        self.backfilling = False    # Догружается пропуск после переподключения - свечи стрима ждут его
+        self.pending = []           # Пачки, пришедшие до загрузки истории
+        self.lock = threading.Lock()
+
+    @property
+    def key(self):
+        return self.category, self.symbol
+
+    @property
+    def label(self):
+        """Подпись в списке инструментов"""
+        return f"{self.symbol} ({self.category})"
+
+    def read_history(self, hours=HISTORY_HOURS):
+        """История из хранилища + догрузка пропусков с биржи (фоновый поток): колонки или None"""
+        end_time = datetime.now()
+        start_time = end_time - timedelta(hours=hours)
+        records = load_history(self.store, int(start_time.timestamp() * 1000), int(end_time.timestamp() * 1000))
+        if not len(records):
+            return None
+        return frozen_columns(records, FIELDS)
+
+    def read_cached(self, hours=HISTORY_HOURS):
+        """Свечи из локального хранилища без обращения к бирже (фоновый поток): колонки или None"""
+        end_ms = int(datetime.now().timestamp() * 1000)
+        records = self.store.read(end_ms - int(hours * 3600 * 1000), end_ms)
+        if not len(records):
+            return None
+        return frozen_columns(records, FIELDS)
+
+    def preview(self, columns):
+        """Свечи из хранилища в буфер до загрузки истории (только главный поток): True, если добавлены"""
+        if self.loaded or columns is None:
+            return False
+        self.candles.extend(columns)
+        self.timeframes.update()
+        self.previewed = True
+        return True
+
+    def fetch_recent(self):
+        """Свечи с последней известной до текущей (фоновый поток): колонки или None.
+
+        Пропуск любой длины догружается с биржи окнами, уже сохраненные свечи
+        берутся из хранилища.
+        """
+        if not self.loaded or not self.last_timestamp:
+            return None
+        end_ms = int(datetime.now().timestamp() * 1000)
+        records = load_history(self.store, self.last_timestamp, end_ms, concurrent=False, verbose=False)
+        if not len(records):
+            return None
+        return frozen_columns(records, FIELDS)
+
+    def hold(self):
+        """Придержать свечи стрима до догрузки пропуска (только главный поток)"""
+        if self.loaded:
+            self.backfilling = True
+
+    def prepare(self, raw_data):
+        """Разбор свечей (REST или стрим) и сохранение закрытых в хранилище (фоновый поток)"""
+        columns = parse_candles(raw_data)
+        now_ms = int(datetime.now().timestamp() * 1000)
+        try:
+            self.store.write(closed_candles(records_from_columns(columns), now_ms))
+        except Exception as e:
+            # Ошибка записи на диск не должна терять свечу графика
+            print(f"Ошибка сохранения свечей {self.symbol}: {str(e)}")
+        return frozen_columns(columns, FIELDS)
+
+    def apply(self, columns, history=False, backfill=False):
+        """Добавление пачки в буфер и таймфреймы (только главный поток).
+
+        Возвращает добавленные/измененные свечи или None. Пачки, пришедшие до
+        истории или во время догрузки пропуска (hold), откладываются и применяются
+        сразу после нее - иначе более старые свечи пропуска были бы отброшены.
+        """
+        # Время слияния учитывается один раз за пачку, вместе с применением отложенных
+        with registry.timer('merge'):
+            return self._apply(columns, history, backfill)
+
+    def _apply(self, columns, history=False, backfill=False):
+        if history:
+            if self.previewed:
+                # История заменяет предварительные свечи целиком (в них могли быть пропуски)
+                self.candles.clear()
+                self.timeframes.reset()
+                self.previewed = False
+            if columns is not None:
+                self.candles.extend(columns)
+                self.last_timestamp = self.candles.last_timestamp
+            self.loaded = True
+            pending, self.pending = self.pending, []
+            return self._apply_all(pending) if pending else columns
+        if backfill:
+            self.backfilling = False
+            if not self.loaded:
+                return None
+            batches = ([columns] if columns is not None else []) + self.pending
+            self.pending = []
+            return self._apply_all(batches) if batches else None
+        if not self.loaded or self.backfilling:
+            self.pending.append(columns)
+            return None
+
+        # Фильтруем новые данные, включая формирующуюся последнюю свечу
+        if self.last_timestamp:
+            newer = columns['timestamp'] >= self.last_timestamp
+            columns = {name: column[newer] for name, column in columns.items()}
+        if len(columns['timestamp']) == 0:
+            return None
+        registry.count('merge.candles', len(columns['timestamp']))
+        self.candles.extend(columns)
+        self.timeframes.update()
+        self.last_timestamp = self.candles.last_timestamp
+        return columns
+
+    def _apply_all(self, batches):
+        return self._apply(coalesce_columns(batches))
+
+
+class Watchlist:
+    """Загрузка и обновление свечей всех инструментов списка.
+
+    На каждую категорию рынка - одно WebSocket-соединение со всеми ее символами;
+    история и REST-догрузка идут через общий пул потоков и общий лимит запросов
+    (data.fetch_data.rate_limiter), так что число инструментов не увеличивает
+    нагрузку на API сверх лимита. Фоновые потоки только разбирают и сохраняют
+    свечи и публикуют CandleBatch в bus; в буферы их добавляет главный поток (apply).
+    """
+
+    def __init__(self, bus, instruments=WATCHLIST, stream_url=None):
+        self.instruments = {}
+        for category, symbol in instruments:
+            instrument = Instrument(category, symbol)
+            self.instruments[instrument.key] = instrument
+        self.bus = bus
+        self.stream_url = stream_url  # Один адрес для всех категорий (например, локальный тестовый сервер)
+        self.executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS)
+        self.streams = {}
+        self._stop = threading.Event()
+        self._poll_thread = None
+
+    def __iter__(self):
+        return iter(self.instruments.values())
+
+    def get(self, key):
+        return self.instruments[key]
+
+    def by_label(self, label):
+        return next(instrument for instrument in self if instrument.label == label)
+
+    def start(self):
+        """Фоновая загрузка истории всех инструментов, запуск стримов и резервного опроса REST"""
+        for instrument in self:
+            self.load(instrument)
+
+        categories = {}
+        for instrument in self:
+            categories.setdefault(instrument.category, []).append(instrument.symbol)
+        for category, symbols in categories.items():
+            url = f"{self.stream_url}/{category}" if self.stream_url else None
+            stream = KlineStream(
+                lambda symbol, rows, category=category: self._on_stream(category, symbol, rows),
+                on_connect=lambda category=category: self._refresh(category),
+                url=url, symbols=symbols, category=category
+            )
+            stream.start()
+            self.streams[category] = stream
+
+        self._stop.clear()
+        self._poll_thread = threading.Thread(target=self._poll, daemon=True)
+        self._poll_thread.start()
+
+    def stop(self):
+        self._stop.set()
+        for stream in self.streams.values():
+            stream.stop()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def load(self, instrument):
+        """Загрузка истории инструмента в фоне (повторный вызов во время загрузки ничего не делает)"""
+        with instrument.lock:
+            if instrument.loaded or instrument.loading:
+                return
+            instrument.loading = True
+
+        def run():
+            try:
+                # Сначала свечи из хранилища - график появляется до догрузки с биржи
+                cached = instrument.read_cached()
+                if cached is not None:
+                    self.bus.publish(Preview(instrument.key, cached))
+                columns = instrument.read_history()
+            except Exception as e:
+                print(f"Ошибка загрузки истории {instrument.symbol}: {str(e)}")
+                columns = None
+            self.bus.publish(CandleBatch(instrument.key, columns, True))
+        self.executor.submit(run)
+
+    def connected(self, instrument):
+        """Получает ли инструмент свечи через WebSocket"""
+        stream = self.streams.get(instrument.category)
+        return stream is not None and stream.connected
+
+    def applied(self, instrument, columns):
+        """Пачка добавлена в буфер инструмента (главный поток); в наследниках - учет задержки"""
+
+    def _on_stream(self, category, symbol, rows):
+        instrument = self.instruments.get((category, symbol))
+        if instrument is None:
+            return
+        try:
+            self.bus.publish(CandleBatch(instrument.key, instrument.prepare(rows), False))
+        except Exception as e:
+            print(f"Ошибка обработки свечей стрима {symbol}: {str(e)}")
+
+    def _refresh(self, category=None):
+        """Догрузка через REST пропущенных свечей (после переподключения или без стрима)"""
+        for instrument in self:
+            if category is None or instrument.category == category:
+                # Свечи стрима после переподключения ждут догрузки: порядок на шине - hold раньше них
+                self.bus.publish(Hold(instrument.key))
+                self.executor.submit(self._fetch, instrument)
+
+    def _fetch(self, instrument):
+        columns = None
+        try:
+            columns = instrument.fetch_recent()
+        except Exception as e:
+            print(f"Ошибка обновления {instrument.symbol}: {str(e)}")
+        # Публикуется и пустая догрузка - она отпускает придержанные свечи стрима
+        self.bus.publish(CandleBatch(instrument.key, columns, False, True))
+
+    def _poll(self):
+        """Резервный опрос REST для категорий, стрим которых не подключен"""
+        while not self._stop.wait(WATCHLIST_POLL_INTERVAL):
+            for category, stream in self.streams.items():
+                if not stream.connected:
+                    self._refresh(category)
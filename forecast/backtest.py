@@ -0,0 +1,264 @@
+"""Пакетный бэктест методов прогнозирования: walk-forward по истории из локального хранилища
+
+Запуск: python -m forecast.backtest --days 30 --timeframe 5 --methods ARIMA SVM --output report.json
+Работает без GUI и сети: свечи читаются из CandleStore, недостающие дни нужно
+заранее загрузить (приложением или data.candle_store.load_history).
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from config import FORECAST_PERIODS, HISTORY_HOURS, INTERVAL, SYMBOL, CATEGORY
+from data.candle_store import CandleStore, DAY_MS
+from data.resample import aggregate_candles
+from forecast.base import FORECASTERS, get_forecaster
+import forecast.models  # Регистрация встроенных методов
+
+# Колонки, подключенные процессом пула (заполняется в attach_arrays)
+_ARRAYS = {}
+_SEGMENTS = []
+
+
+class SharedArrays:
+    """Массивы в разделяемой памяти: создаются в главном процессе, процессы пула
+    подключаются к ним по имени вместо получения копии через pickle.
+    """
+
+    def __init__(self, arrays):
+        self.segments = []
+        self.spec = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, array.dtype, buffer=segment.buf)[:] = array
+            self.segments.append(segment)
+            self.spec[name] = (segment.name, array.dtype.str, array.shape)
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+            segment.unlink()
+        self.segments = []
+
+
+# Один поток BLAS/OpenMP на процесс - параллельность дает сам пул
+THREAD_LIMITS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS')
+
+
+@contextlib.contextmanager
+def single_threaded_children():
+    """Ограничение потоков вычислений в дочерних процессах: переменные читаются при импорте
+    NumPy, поэтому задаются в главном процессе до запуска пула spawn (пользовательские не меняются)
+    """
+    saved = {name: os.environ.get(name) for name in THREAD_LIMITS}
+    for name in THREAD_LIMITS:
+        os.environ.setdefault(name, '1')
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+
+
+def attach_arrays(spec):
+    """Инициализатор процесса пула: подключение к массивам SharedArrays"""
+    for name, (segment_name, dtype, shape) in spec.items():
+        # Процессы spawn используют трекер ресурсов главного процесса - сегмент удалит создатель
+        segment = shared_memory.SharedMemory(name=segment_name)
+        _SEGMENTS.append(segment)
+        _ARRAYS[name] = np.ndarray(shape, np.dtype(dtype), buffer=segment.buf)
+
+
+def series_methods():
+    """Методы, прогнозирующие ценовой ряд (kind='series') - только их можно сравнить с фактическими свечами"""
+    return [name for name, cls in FORECASTERS.items() if cls.kind == 'series']
+
+
+def walk_forward_origins(n, train, horizon, step):
+    """Точки прогноза: обучение на train свечах до точки, проверка на horizon свечах после"""
+    return np.arange(train, n - horizon + 1, step)
+
+
+def evaluate_folds(method, settings, origins, train, horizon, refit):
+    """Прогнозы метода в точках origins (выполняется в процессе пула).
+
+    Модель обучается в первой точке и, если метод поддерживает дообучение и
+    refit='online', переносится к следующим точкам через update() - полный fit
+    только по needs_refit(), как в приложении. refit='always' - fit в каждой точке.
+    """
+    timestamp, close = _ARRAYS['timestamp'], _ARRAYS['close']
+    errors = np.full((len(origins), horizon), np.nan)
+    naive = np.full((len(origins), horizon), np.nan)
+    relative = np.full((len(origins), horizon), np.nan)
+    direction = np.zeros(len(origins), dtype=bool)
+    stats = {'fits': 0, 'updates': 0, 'failed': 0, 'fit_time': 0.0, 'update_time': 0.0}
+
+    model = None
+    previous = None
+    for i, origin in enumerate(origins):
+        try:
+            started = time.perf_counter()
+            if model is None or refit == 'always' or not model.online or model.needs_refit():
+                model = get_forecaster(method, settings).fit(timestamp[origin - train:origin],
+                                                             close[origin - train:origin])
+                stats['fits'] += 1
+                stats['fit_time'] += time.perf_counter() - started
+            else:
+                model.update(timestamp[previous:origin], close[previous:origin])
+                stats['updates'] += 1
+                stats['update_time'] += time.perf_counter() - started
+            previous = origin
+            predicted = np.asarray(model.predict(horizon), dtype=float)
+        except Exception:
+            stats['failed'] += 1
+            model = None
+            continue
+
+        last = close[origin - 1]
+        actual = close[origin:origin + horizon]
+        errors[i] = predicted - actual
+        naive[i] = last - actual
+        relative[i] = errors[i] / actual
+        direction[i] = np.sign(predicted[-1] - last) == np.sign(actual[-1] - last)
+    return errors, naive, relative, direction, stats
+
+
+def summarize(method, parts):
+    """Метрики метода по результатам всех блоков точек"""
+    errors = np.concatenate([part[0] for part in parts])
+    naive = np.concatenate([part[1] for part in parts])
+    relative = np.concatenate([part[2] for part in parts])
+    direction = np.concatenate([part[3] for part in parts])
+    valid = ~np.isnan(errors).any(axis=1)
+    stats = {key: sum(part[4][key] for part in parts) for key in parts[0][4]}
+
+    report = {'method': method, 'folds': int(valid.sum()), **stats}
+    if valid.any():
+        errors, naive, relative = errors[valid], naive[valid], relative[valid]
+        mae = float(np.abs(errors).mean())
+        naive_mae = float(np.abs(naive).mean())
+        report.update({
+            'mae': mae,
+            'rmse': float(np.sqrt((errors ** 2).mean())),
+            'mape': float(np.abs(relative).mean() * 100),
+            'mae_vs_naive': mae / naive_mae if naive_mae else None,  # < 1 - лучше прогноза "цена не изменится"
+            'direction_accuracy': float(direction[valid].mean()),
+            'mae_by_step': np.abs(errors).mean(axis=0).tolist()
+        })
+    return report
+
+
+def run_backtest(timestamp, close, methods, settings=None, train=None, horizon=FORECAST_PERIODS, step=None,
+                 workers=None, refit='online', chunks_per_worker=4):
+    """Walk-forward бэктест методов на ряду закрытий, точки распределяются по процессам пула.
+
+    Возвращает список отчетов по методам (см. summarize). settings - словарь
+    {метод: настройки}. step по умолчанию равен horizon (непересекающиеся окна проверки).
+    Методы без ценового ряда (уровни) и неизвестные методы - ValueError.
+    """
+    unknown = [name for name in methods if name not in series_methods()]
+    if unknown:
+        raise ValueError(f"Неизвестные методы или методы без ценового ряда: {', '.join(unknown)}")
+    settings = settings or {}
+    train = train or HISTORY_HOURS * 60
+    step = step or horizon
+    workers = workers or os.cpu_count()
+    origins = walk_forward_origins(len(close), train, horizon, step)
+    if len(origins) == 0:
+        raise ValueError(f"Недостаточно данных: {len(close)} свечей при обучении на {train} и горизонте {horizon}")
+
+    shared = SharedArrays({'timestamp': np.asarray(timestamp, dtype=np.int64),
+                           'close': np.asarray(close, dtype=np.float64)})
+    try:
+        with single_threaded_children(), \
+                ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                    initializer=attach_arrays, initargs=(shared.spec,)) as executor:
+            chunks = np.array_split(origins, min(len(origins), workers * chunks_per_worker))
+            futures = {
+                method: [executor.submit(evaluate_folds, method, settings.get(method), chunk, train, horizon, refit)
+                         for chunk in chunks]
+                for method in methods
+            }
+            return [summarize(method, [future.result() for future in method_futures])
+                    for method, method_futures in futures.items()]
+    finally:
+        shared.close()
+
+
+def load_closes(store, start_ms, end_ms, timeframe):
+    """Закрытия из хранилища за диапазон, агрегированные в свечи timeframe минут"""
+    records = store.read(start_ms, end_ms)
+    columns = {name: records[name] for name in records.dtype.names}
+    if timeframe != INTERVAL and len(records):
+        columns = aggregate_candles(columns, timeframe)
+    return columns['timestamp'], columns['close']
+
+
+def print_report(reports):
+    print(f"{'метод':>22} | {'точек':>6} | {'MAE':>10} | {'RMSE':>10} | {'MAPE, %':>8} | "
+          f"{'к наивному':>10} | {'направление':>11} | {'fit':>5} | {'update':>6}")
+    for report in reports:
+        if 'mae' not in report:
+            print(f"{report['method']:>22} | {report['folds']:>6} | нет успешных прогнозов ({report['failed']} ошибок)")
+            continue
+        print(f"{report['method']:>22} | {report['folds']:>6} | {report['mae']:>10.2f} | {report['rmse']:>10.2f} | "
+              f"{report['mape']:>8.3f} | {report['mae_vs_naive']:>10.3f} | {report['direction_accuracy']:>11.1%} | "
+              f"{report['fits']:>5} | {report['updates']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--methods', nargs='+', default=None,
+                        help=f"Методы (по умолчанию все доступные): {', '.join(series_methods())}")
+    parser.add_argument('--symbol', default=SYMBOL, help="Символ")
+    parser.add_argument('--category', default=CATEGORY, help="Категория рынка (spot/linear)")
+    parser.add_argument('--days', type=float, default=30, help="Длина истории в днях до последней свечи хранилища")
+    parser.add_argument('--timeframe', type=int, default=INTERVAL, help="Таймфрейм в минутах")
+    parser.add_argument('--train', type=int, default=None, help="Свечей в окне обучения (по умолчанию HISTORY_HOURS)")
+    parser.add_argument('--horizon', type=int, default=FORECAST_PERIODS, help="Горизонт прогноза в свечах")
+    parser.add_argument('--step', type=int, default=None, help="Шаг между точками прогноза в свечах (по умолчанию = горизонт)")
+    parser.add_argument('--refit', choices=['online', 'always'], default='online',
+                        help="online - дообучение между точками, always - полный fit в каждой точке")
+    parser.add_argument('--workers', type=int, default=None, help="Количество процессов (по умолчанию - все ядра)")
+    parser.add_argument('--output', default=None, help="Путь для отчета в JSON")
+    args = parser.parse_args()
+
+    methods = args.methods or [name for name in series_methods() if FORECASTERS[name].is_available()]
+
+    store = CandleStore(category=args.category, symbol=args.symbol)
+    bounds = store.bounds()
+    if bounds is None:
+        print(f"Хранилище свечей пусто: {store.directory}")
+        return
+    end_ms = bounds[1]
+    start_ms = max(bounds[0], end_ms - int(args.days * DAY_MS))
+    timestamp, close = load_closes(store, start_ms, end_ms, args.timeframe)
+    train = args.train or HISTORY_HOURS * 60 // args.timeframe
+    print(f"Свечей: {len(close)}, методы: {', '.join(methods)}, обучение: {train}, горизонт: {args.horizon}")
+
+    started = time.perf_counter()
+    try:
+        reports = run_backtest(timestamp, close, methods, train=train, horizon=args.horizon, step=args.step,
+                               workers=args.workers, refit=args.refit)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Время бэктеста: {time.perf_counter() - started:.1f} с\n")
+    print_report(reports)
+
+    if args.output:
+        meta = {'symbol': args.symbol, 'category': args.category, 'start': int(timestamp[0]), 'end': int(timestamp[-1]),
+                'timeframe': args.timeframe, 'train': train, 'horizon': args.horizon,
+                'step': args.step or args.horizon, 'refit': args.refit}
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'params': meta, 'methods': reports}, f, ensure_ascii=False, indent=2)
+        print(f"\nОтчет сохранен: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
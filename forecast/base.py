@@ -0,0 +1,111 @@
+import importlib.util
+import numpy as np
+from config import FORECAST_REFIT_EVERY, FORECAST_DRIFT_THRESHOLD
+
+# Реестр методов прогнозирования: название -> класс
+FORECASTERS = {}
+
+
+def register(cls):
+    """Декоратор регистрации метода прогнозирования в реестре (порядок регистрации = порядок в списке)"""
+    FORECASTERS[cls.name] = cls
+    return cls
+
+
+def available_methods():
+    """Названия всех зарегистрированных методов для выпадающего списка"""
+    return list(FORECASTERS)
+
+
+def get_forecaster(name, settings=None):
+    """Экземпляр метода прогнозирования по названию"""
+    if name not in FORECASTERS:
+        raise ValueError(f"Неизвестный метод прогнозирования: {name}")
+    cls = FORECASTERS[name]
+    if not cls.is_available():
+        raise ImportError(f"Для метода {name} требуются пакеты: {', '.join(cls.requires)}")
+    return cls(**(settings or {}))
+
+
+class Forecaster:
+    """Базовый класс метода прогнозирования.
+
+    fit() получает цены закрытия (np.ndarray, по возрастанию времени), predict()
+    возвращает horizon значений на следующие свечи (kind='series') или набор
+    ценовых уровней (kind='levels').
+    """
+
+    name = None
+    kind = 'series'
+    requires = ()          # Необязательные пакеты, без которых метод недоступен
+    default_settings = {}
+    online = False         # Поддерживает ли метод дообучение update() без полного fit
+    refit_every = FORECAST_REFIT_EVERY
+
+    def __init__(self, **settings):
+        self.settings = {**self.default_settings, **settings}
+
+    @classmethod
+    def is_available(cls):
+        """Установлены ли необязательные зависимости метода"""
+        return all(importlib.util.find_spec(package) is not None for package in cls.requires)
+
+    def fit(self, timestamp, close):
+        raise NotImplementedError
+
+    def predict(self, horizon):
+        raise NotImplementedError
+
+    def start_updates(self, timestamp, error_scale=1.0):
+        """Вызывается в конце fit онлайн-метода: точка отсчета для update() и детектор сдвига"""
+        self.last_timestamp = int(timestamp[-1])
+        self.step_ms = candle_step(timestamp)
+        self.updates = 0
+        self.drift = DriftDetector(error_scale)
+
+    def update(self, timestamp, close):
+        """Дообучение на закрытых свечах, продолжающих ряд из fit: O(1) на свечу независимо от длины истории"""
+        for value in close:
+            error = self.step(float(value))
+            if error is not None:
+                self.drift.add(error)
+        self.last_timestamp = int(timestamp[-1])
+        self.updates += len(close)
+        return self
+
+    def step(self, value):
+        """Учет одной новой цены закрытия, возвращает ошибку одношагового прогноза (или None)"""
+        raise NotImplementedError
+
+    def needs_refit(self):
+        """Полное переобучение вместо дообучения: по расписанию или при обнаружении сдвига"""
+        return self.updates >= self.refit_every or self.drift.detected
+
+
+def candle_step(timestamp):
+    """Длительность свечи в мс по меткам времени"""
+    return int(np.median(np.diff(timestamp))) if len(timestamp) > 1 else 60 * 1000
+
+
+class DriftDetector:
+    """Тест Пейджа-Хинкли на квадратах нормированных одношаговых ошибок.
+
+    Ошибки делятся на error_scale (СКО ошибок при обучении), так что без сдвига
+    квадрат в среднем около 1 и накопленная сумма (z**2 - 1 - delta) убывает;
+    устойчивый рост ошибок поднимает ее над минимумом больше чем на threshold.
+    """
+
+    def __init__(self, error_scale, threshold=FORECAST_DRIFT_THRESHOLD, delta=0.5):
+        self.error_scale = error_scale or 1.0
+        self.threshold = threshold
+        self.delta = delta
+        self.cumulative = 0.0
+        self.minimum = 0.0
+
+    def add(self, error):
+        self.cumulative += (error / self.error_scale) ** 2 - 1 - self.delta
+        self.minimum = min(self.minimum, self.cumulative)
+
+    @property
+    def detected(self):
+        return self.cumulative - self.minimum > self.threshold
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from datetime import datetime
+import numpy as np
+from config import FORECAST_CACHE_SIZE, FORECAST_CACHE_PATH
+
+
+def settings_hash(settings):
+    """Короткий хэш настроек метода (порядок ключей не важен)"""
+    return hashlib.sha1(json.dumps(settings or {}, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def make_key(symbol, timeframe, last_closed_timestamp, method, settings, horizon):
+    """Ключ кэша: прогноз однозначно определяется данными до последней закрытой свечи и настройками"""
+    return (symbol, timeframe, int(last_closed_timestamp), method, settings_hash(settings), horizon)
+
+
+def closed_forecast_key(symbol, timeframe, timestamp, method, settings, horizon):
+    """Прогноз по закрытым свечам: (число закрытых свечей, ключ кэша) или None, если закрытых нет.
+
+    Формирующаяся последняя свеча в обучение не попадает.
+    """
+    now_ms = int(datetime.now().timestamp() * 1000)
+    closed = int(np.searchsorted(timestamp, now_ms - timeframe * 60 * 1000, side='right'))
+    if closed == 0:
+        return None
+    return closed, make_key(symbol, timeframe, timestamp[closed - 1], method, settings, horizon)
+
+
+def series_key(key):
+    """Ключ без метки последней свечи: модели одного ряда можно дообучать новыми свечами"""
+    return key[:2] + key[3:]
+
+
+class ForecastCache:
+    """LRU-кэш результатов прогнозов и обученных моделей с необязательным сохранением на диск.
+
+    Запись - пара (ForecastResult, обученный Forecaster). С directory записи
+    дублируются в pickle-файлы и переживают перезапуск приложения; на диске
+    хранится не больше max_entries файлов, самые старые удаляются.
+    """
+
+    def __init__(self, max_entries=FORECAST_CACHE_SIZE, directory=FORECAST_CACHE_PATH):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """Запись по ключу или None; найденная запись становится самой свежей"""
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+
+        entry = self._load(key)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        """Сохранение записи в памяти и (если задан каталог) на диске"""
+        self._remember(key, entry)
+        self._save(key, entry)
+
+    def _remember(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def _path(self, key):
+        name = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.directory, f"{name}.pkl")
+
+    def _load(self, key):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                stored_key, entry = pickle.load(f)
+            return entry if stored_key == key else None
+        except Exception as e:
+            print(f"Ошибка чтения кэша прогноза: {str(e)}")
+            return None
+
+    def _save(self, key, entry):
+        if not self.directory:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{self._path(key)}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump((key, entry), f)
+            os.replace(tmp_path, self._path(key))
+            self._evict_files()
+        except Exception as e:
+            # Модели некоторых библиотек не сериализуются - кэш остается только в памяти
+            print(f"Ошибка сохранения кэша прогноза: {str(e)}")
+
+    def _evict_files(self):
+        files = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.pkl')]
+        if len(files) > self.max_entries:
+            files.sort(key=os.path.getmtime)
+            for path in files[:len(files) - self.max_entries]:
+                os.remove(path)
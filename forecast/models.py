@@ -0,0 +1,298 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from data.indicators import Indicators, indicator_features
+from forecast.base import Forecaster, register, candle_step
+
+# Тяжелые библиотеки (sklearn, xgboost, prophet, torch) импортируются внутри fit,
+# чтобы список методов строился без их загрузки
+
+
+@register
+class ArimaForecaster(Forecaster):
+    """ARIMA(p, d, 0): авторегрессия на d-кратных разностях цены, коэффициенты - МНК.
+
+    Дообучение - рекурсивный МНК: с forgetting=1 коэффициенты после update()
+    совпадают с МНК по всему продленному ряду, меньшие значения забывают старые свечи.
+    """
+
+    name = "ARIMA"
+    default_settings = {'p': 5, 'd': 1, 'forgetting': 1.0}
+    online = True
+
+    def fit(self, timestamp, close):
+        p, d = self.settings['p'], self.settings['d']
+        series = np.asarray(close, dtype=float)
+
+        # Последние значения каждого уровня разностей - для обратного интегрирования прогноза
+        self.tails = []
+        for _ in range(d):
+            self.tails.append(series[-1])
+            series = np.diff(series)
+        if len(series) <= 2 * p + 1:
+            raise ValueError("Недостаточно данных для ARIMA")
+
+        # Колонка k - лаг k+1
+        n = len(series)
+        X = np.column_stack([np.ones(n - p)] + [series[p - k - 1:n - k - 1] for k in range(p)])
+        self.coef = np.linalg.lstsq(X, series[p:], rcond=None)[0]
+        self.precision = np.linalg.pinv(X.T @ X)  # (X^T X)^-1 - состояние рекурсивного МНК
+        self.history = series[-p:]
+        self.start_updates(timestamp, np.std(series[p:] - X @ self.coef))
+        return self
+
+    def step(self, value):
+        # Новое значение на каждом уровне разностей
+        for i in range(len(self.tails)):
+            value, self.tails[i] = value - self.tails[i], value
+
+        x = np.concatenate(([1.0], self.history[::-1]))
+        error = value - x @ self.coef
+        lam = self.settings['forgetting']
+        gain = self.precision @ x / (lam + x @ self.precision @ x)
+        self.coef = self.coef + gain * error
+        self.precision = (self.precision - np.outer(gain, x @ self.precision)) / lam
+        self.history = np.append(self.history[1:], value)
+        return error
+
+    def predict(self, horizon):
+        p = self.settings['p']
+        history = list(self.history)
+        forecast = []
+        for _ in range(horizon):
+            lags = history[::-1][:p]
+            value = self.coef[0] + np.dot(self.coef[1:], lags)
+            history.append(value)
+            forecast.append(value)
+
+        forecast = np.array(forecast)
+        for last in reversed(self.tails):
+            forecast = last + np.cumsum(forecast)
+        return forecast
+
+
+class LagRegressionForecaster(Forecaster):
+    """Регрессия следующей лог-доходности по lags предыдущим, прогноз рекурсивно на horizon шагов.
+
+    С indicators=True к лагам добавляются признаки data.indicators (волатильность,
+    отклонение от EMA, RSI); при рекурсивном прогнозе они досчитываются по
+    предсказанным ценам. update() не переобучает модель: новая свеча сдвигает окно
+    признаков за O(1), ошибка одношагового прогноза идет в детектор сдвига.
+    """
+
+    default_settings = {'lags': 10, 'indicators': False}
+    online = True
+
+    def make_model(self):
+        raise NotImplementedError
+
+    def fit(self, timestamp, close):
+        close = np.asarray(close, dtype=float)
+        lags = self.settings['lags']
+        returns = np.diff(np.log(close))
+        if len(returns) <= 2 * lags:
+            raise ValueError(f"Недостаточно данных для {self.name}")
+
+        # Нормировка: доходности порядка 1e-4 плохо подходят для SVR/нейросети
+        self.scale = returns.std() or 1.0
+        returns = returns / self.scale
+
+        # Строка i: доходности returns[i:i + lags], последняя известная цена - close[i + lags]
+        X = sliding_window_view(returns[:-1], lags)
+        y = returns[lags:]
+        self.indicators = None
+        if self.settings.get('indicators'):
+            self.indicators = Indicators()
+            extra = indicator_features(self.indicators.extend(close), close, self.scale)
+            self.extra = extra[-1]
+            X = np.hstack([X, extra[lags:-1]])
+            valid = ~np.isnan(X).any(axis=1)
+            X, y = X[valid], y[valid]
+
+        self.model = self.make_model()
+        self.model.fit(X, y)
+        self.window = returns[-lags:]
+        self.last_close = close[-1]
+        # Доходности нормированы, поэтому масштаб ошибок при обучении - 1
+        self.start_updates(timestamp)
+        return self
+
+    def predict(self, horizon):
+        lags = self.settings['lags']
+        window = list(self.window)
+        indicators = self.indicators.copy() if self.indicators is not None else None
+        extra = self.extra if indicators is not None else None
+        close = self.last_close
+        forecast = []
+        for _ in range(horizon):
+            value = self._predict_next(np.array(window[-lags:]), extra)
+            window.append(value)
+            forecast.append(value)
+            if indicators is not None:
+                close = close * np.exp(value * self.scale)
+                extra = self._next_extra(indicators, close)
+        return self.last_close * np.exp(np.cumsum(forecast) * self.scale)
+
+    def step(self, value):
+        ret = np.log(value / self.last_close) / self.scale
+        error = ret - self._predict_next(self.window, self.extra if self.indicators is not None else None)
+        self.window = np.append(self.window[1:], ret)
+        self.last_close = value
+        if self.indicators is not None:
+            self.extra = self._next_extra(self.indicators, value)
+        return error
+
+    def _predict_next(self, window, extra):
+        row = window if extra is None else np.concatenate((window, extra))
+        return float(np.ravel(self.model.predict(row[None, :]))[0])
+
+    def _next_extra(self, indicators, close):
+        return indicator_features(indicators.extend([close]), [close], self.scale)[-1]
+
+
+@register
+class LstmForecaster(LagRegressionForecaster):
+    """LSTM (PyTorch) по окну нормированных доходностей"""
+
+    name = "LSTM"
+    requires = ('torch',)
+    default_settings = {'lags': 30, 'hidden': 32, 'epochs': 30, 'lr': 0.01}
+
+    def make_model(self):
+        return _LstmRegressor(self.settings['hidden'], self.settings['epochs'], self.settings['lr'])
+
+
+@register
+class ProphetForecaster(Forecaster):
+    """Prophet: тренд с точками излома и внутридневная сезонность"""
+
+    name = "Prophet"
+    requires = ('prophet',)
+    default_settings = {'changepoint_prior_scale': 0.05}
+
+    def fit(self, timestamp, close):
+        import pandas as pd
+        from prophet import Prophet
+
+        self.step_ms = candle_step(timestamp)
+        df = pd.DataFrame({'ds': pd.to_datetime(np.asarray(timestamp), unit='ms'), 'y': close})
+        self.model = Prophet(changepoint_prior_scale=self.settings['changepoint_prior_scale'],
+                             daily_seasonality=True, weekly_seasonality=False, yearly_seasonality=False)
+        self.model.fit(df)
+        return self
+
+    def predict(self, horizon):
+        future = self.model.make_future_dataframe(periods=horizon, freq=f"{self.step_ms}ms", include_history=False)
+        return self.model.predict(future)['yhat'].to_numpy()
+
+
+@register
+class SvmForecaster(LagRegressionForecaster):
+    """SVR (scikit-learn) по лагам доходностей"""
+
+    name = "SVM"
+    requires = ('sklearn',)
+    default_settings = {'lags': 10, 'indicators': True, 'C': 1.0, 'epsilon': 0.1}
+
+    def make_model(self):
+        from sklearn.svm import SVR
+        return SVR(C=self.settings['C'], epsilon=self.settings['epsilon'])
+
+
+@register
+class XgboostForecaster(LagRegressionForecaster):
+    """Градиентный бустинг XGBoost по лагам доходностей"""
+
+    name = "XGBoost"
+    requires = ('xgboost',)
+    default_settings = {'lags': 10, 'indicators': True, 'n_estimators': 200, 'max_depth': 4, 'learning_rate': 0.05}
+
+    def make_model(self):
+        from xgboost import XGBRegressor
+        return XGBRegressor(n_estimators=self.settings['n_estimators'],
+                            max_depth=self.settings['max_depth'],
+                            learning_rate=self.settings['learning_rate'])
+
+
+@register
+class LevelsForecaster(Forecaster):
+    """Горизонтальные уровни: цены, возле которых чаще всего были локальные экстремумы"""
+
+    name = "Горизонтальные уровни"
+    kind = 'levels'
+    default_settings = {'window': 5, 'bins': 50, 'count': 5}
+    online = True
+
+    def fit(self, timestamp, close):
+        close = np.asarray(close, dtype=float)
+        w = self.settings['window']
+        if len(close) <= 2 * w:
+            raise ValueError("Недостаточно данных для поиска уровней")
+
+        # Локальный экстремум - максимум или минимум в окне +-window свечей
+        windows = sliding_window_view(close, 2 * w + 1)
+        center = close[w:-w]
+        pivots = center[(center == windows.max(axis=1)) | (center == windows.min(axis=1))]
+
+        self.counts, self.edges = np.histogram(pivots, bins=self.settings['bins'])
+        self.tail = close[-2 * w:]
+        self.out_of_range = False
+        self.start_updates(timestamp)
+        return self
+
+    def predict(self, horizon):
+        counts, edges = self.counts, self.edges
+        top = np.argsort(counts)[::-1][:self.settings['count']]
+        top = top[counts[top] > 0]
+        return np.sort((edges[top] + edges[top + 1]) / 2)
+
+    def step(self, value):
+        # С новой свечой окно вокруг свечи tail[w] становится полным - она может оказаться экстремумом
+        w = self.settings['window']
+        window = np.append(self.tail, value)
+        center = window[w]
+        if center == window.max() or center == window.min():
+            if self.edges[0] <= center <= self.edges[-1]:
+                self.counts[min(np.searchsorted(self.edges, center, side='right') - 1, len(self.counts) - 1)] += 1
+            else:
+                # Экстремум вне сетки гистограммы - уровни нужно строить заново
+                self.out_of_range = True
+        self.tail = window[1:]
+        return None
+
+    def needs_refit(self):
+        return self.out_of_range or super().needs_refit()
+
+
+class _LstmRegressor:
+    """Минимальная LSTM-регрессия с интерфейсом fit/predict как у scikit-learn"""
+
+    def __init__(self, hidden, epochs, lr):
+        self.hidden = hidden
+        self.epochs = epochs
+        self.lr = lr
+
+    def fit(self, X, y):
+        import torch
+
+        # Слои хранятся атрибутами (без вложенного класса модели), чтобы обученное состояние сериализовалось
+        self.lstm = torch.nn.LSTM(1, self.hidden, batch_first=True)
+        self.out = torch.nn.Linear(self.hidden, 1)
+        optimizer = torch.optim.Adam(list(self.lstm.parameters()) + list(self.out.parameters()), lr=self.lr)
+        inputs = torch.tensor(X, dtype=torch.float32).unsqueeze(-1)
+        targets = torch.tensor(y, dtype=torch.float32)
+        for _ in range(self.epochs):
+            optimizer.zero_grad()
+            loss = torch.nn.functional.mse_loss(self._forward(inputs), targets)
+            loss.backward()
+            optimizer.step()
+        return self
+
+    def predict(self, X):
+        import torch
+
+        with torch.no_grad():
+            return self._forward(torch.tensor(X, dtype=torch.float32).unsqueeze(-1)).numpy()
+
+    def _forward(self, inputs):
+        output, _ = self.lstm(inputs)
+        return self.out(output[:, -1]).squeeze(-1)
@@ -0,0 +1,140 @@
+import copy
+import multiprocessing
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+from config import FORECAST_WORKERS
+from forecast.base import get_forecaster
+from forecast.cache import series_key
+from forecast.models import candle_step  # Импорт модуля регистрирует встроенные методы
+from metrics import registry
+
+# Результат прогноза: kind='series' - values на horizon свечей после timestamp, kind='levels' - ценовые уровни
+ForecastResult = namedtuple('ForecastResult', ['method', 'kind', 'values', 'timestamp', 'step_ms'])
+
+
+def run_forecast(method, settings, timestamp, close, horizon):
+    """Обучение модели и прогноз - выполняется в процессе пула, возвращает (результат, обученная модель)"""
+    forecaster = get_forecaster(method, settings)
+    forecaster.fit(timestamp, close)
+    values = np.asarray(forecaster.predict(horizon), dtype=float)
+    result = ForecastResult(method, forecaster.kind, values, int(timestamp[-1]), candle_step(timestamp))
+    return result, forecaster
+
+
+def update_forecast(forecaster, timestamp, close, horizon):
+    """Дообучение копии модели новыми закрытыми свечами и прогноз - без полного переобучения.
+
+    Модель из кэша не меняется: ее запись по-прежнему описывает свою свечу.
+    """
+    forecaster = copy.deepcopy(forecaster)
+    forecaster.update(timestamp, close)
+    values = np.asarray(forecaster.predict(horizon), dtype=float)
+    result = ForecastResult(forecaster.name, forecaster.kind, values, forecaster.last_timestamp, forecaster.step_ms)
+    return result, forecaster
+
+
+class ForecastRunner:
+    """Запуск прогнозов в пуле процессов, чтобы обучение не блокировало GUI и поток данных.
+
+    Одновременно актуален один прогноз: новый запрос отменяет предыдущий.
+    Колбэки вызываются из служебного потока пула - в GUI их нужно передавать через after().
+    Если передан cache_key и в кэше есть запись, on_done вызывается сразу, без пересчета.
+    Последняя обученная модель запоминается: следующий запрос того же ряда (ключ без
+    метки свечи) дообучает ее в потоке только новыми свечами, пока модель не попросит
+    полного переобучения (needs_refit).
+    """
+
+    def __init__(self, workers=FORECAST_WORKERS, cache=None):
+        # spawn: процессы не наследуют состояние Tk и потоков приложения
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        self.updater = ThreadPoolExecutor(max_workers=1)  # Один поток - дообучения модели идут по очереди
+        self.cache = cache
+        self.current = None
+        self.model = None  # (ключ ряда, модель) для дообучения
+
+    def submit(self, method, settings, timestamp, close, horizon, on_done, on_error, cache_key=None):
+        """Постановка прогноза в очередь, возвращает Future (None - результат взят из кэша)"""
+        if self.busy:
+            registry.count('forecast.superseded')  # Новые свечи приходят быстрее, чем считается прогноз
+        self.cancel()
+        if self.cache is not None and cache_key is not None:
+            entry = self.cache.get(cache_key)
+            if entry is not None:
+                self._remember(cache_key, entry[1])
+                on_done(entry[0])
+                return None
+
+        start = self._update_start(cache_key, timestamp)
+        if start is not None:
+            # Копируются только новые свечи - время не зависит от длины истории
+            future = self.updater.submit(update_forecast, self.model[1],
+                                         np.array(timestamp[start:]), np.array(close[start:], dtype=np.float64), horizon)
+        else:
+            future = self.executor.submit(run_forecast, method, settings,
+                                          np.array(timestamp), np.array(close, dtype=np.float64), horizon)
+        self.current = future
+        started = time.perf_counter()
+
+        def done(f):
+            if f.cancelled():
+                return
+            actual = f is self.current
+            if actual:
+                self.current = None
+            registry.observe('forecast', (time.perf_counter() - started) * 1000)
+            error = f.exception()
+            if error is None:
+                # Модель, обученную до замены новым запросом, тоже сохраняем - следующий запрос ее дообучит
+                result, forecaster = f.result()
+                if self.cache is not None and cache_key is not None:
+                    self.cache.put(cache_key, (result, forecaster))
+                self._remember(cache_key, forecaster)
+            # Замененный новым запросом прогноз не показываем
+            if not actual:
+                return
+            if error is not None:
+                on_error(error)
+                return
+            on_done(result)
+
+        future.add_done_callback(done)
+        return future
+
+    def _remember(self, cache_key, forecaster):
+        if cache_key is None or not forecaster.online:
+            return
+        key = series_key(cache_key)
+        # Опоздавший результат старого запроса не заменяет модель, обученную на более новых свечах
+        if (self.model is not None and self.model[0] == key
+                and self.model[1].last_timestamp > forecaster.last_timestamp):
+            return
+        self.model = (key, forecaster)
+
+    def _update_start(self, cache_key, timestamp):
+        """Индекс первой новой свечи для дообучения запомненной модели или None (нужен полный fit)"""
+        if cache_key is None or self.model is None or self.model[0] != series_key(cache_key):
+            return None
+        forecaster = self.model[1]
+        if forecaster.needs_refit():
+            return None
+        # Модель продолжает ряд, только если ее последняя свеча есть в данных
+        pos = np.searchsorted(timestamp, forecaster.last_timestamp)
+        if pos + 1 >= len(timestamp) or timestamp[pos] != forecaster.last_timestamp:
+            return None
+        return pos + 1
+
+    def cancel(self):
+        """Отмена текущего прогноза: ожидающий снимается с очереди, результат уже считающегося игнорируется"""
+        if self.current is not None:
+            future, self.current = self.current, None
+            future.cancel()
+
+    @property
+    def busy(self):
+        return self.current is not None
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.updater.shutdown(wait=False, cancel_futures=True)
@@ -1,15 +1,37 @@
-import tkinter as tk
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
-import pandas as pd
-import matplotlib.dates as mdates
-import threading
 import time
-import numpy as np
+import tkinter as tk
 from tkinter import ttk
-from data.fetch_data import fetch_bybit_candles, fetch_recent_candles
-from data.preprocess_data import prepare_prophet_data
-from config import SYMBOL, INTERVAL, CATEGORY, HISTORY_HOURS
+from metrics import registry, start_exporters, summary_line
+from config import (SYMBOL, INTERVAL, CATEGORY, TIMEFRAMES, LOD_PIXELS_PER_CANDLE, FORECAST_PERIODS, BUS_POLL_MS,
+                    STATUS_FRAME_MS, METRICS_OVERLAY_MS, REPLAY_SOURCE)
+
+
+def import_chart_modules():
+    """Импорт тяжелых модулей (matplotlib, NumPy, pandas, данные, прогнозы) - после показа окна.
+
+    Имена становятся глобальными для модуля, как при импорте в начале файла.
+    """
+    global np, mdates, Figure, NavigationToolbar2Tk, TimedCanvas, Watchlist, DataBus, Call, dispatch_events
+    global CandlestickRenderer, timestamps_to_num, num_to_timestamps, candle_width, OHLCPyramid
+    global ForecastOverlay, IndicatorOverlay, available_methods, ForecastRunner, ForecastCache, closed_forecast_key
+    global IndicatorSeries, ReplayWatchlist
+    import numpy as np
+    import matplotlib.dates as mdates
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_tkagg import NavigationToolbar2Tk
+    from chart.canvas import TimedCanvas
+    from data.watchlist import Watchlist
+    from data.replay import ReplayWatchlist
+    from data.bus import DataBus, Call
+    from data.dispatch import dispatch_events
+    from chart.candles import CandlestickRenderer, timestamps_to_num, num_to_timestamps, candle_width
+    from chart.lod import OHLCPyramid
+    from chart.overlays import ForecastOverlay, IndicatorOverlay
+    from forecast.base import available_methods
+    from forecast.runner import ForecastRunner
+    from forecast.cache import ForecastCache, closed_forecast_key
+    from data.indicators import IndicatorSeries
+
 
 class ProfessionalCandlestickApp(tk.Tk):
     def __init__(self):
@@ -22,9 +44,12 @@ class ProfessionalCandlestickApp(tk.Tk):
         # Инициализация переменных для сохранения масштаба
         self.xlim = None
         self.ylim = None
-        self.last_timestamp = None  # Время последней загруженной свечи
-        # Загрузка данных
-        self.df = self.load_live_data()  # Заменяем загрузку из строки
+        self.awaited_instrument = None  # Выбранный инструмент, история которого еще загружается
+        self.hover_index = None  # Свеча под курсором
+        self.hover_job = None    # Запланированное обновление статуса по наведению
+        self.timeframe = INTERVAL  # Текущий таймфрейм графика в минутах
+        # Элементы, недоступные до подключения графика и данных (init_chart)
+        self.chart_controls = []
         
         # Создание левой панели с кнопками
         left_panel = tk.Frame(self, width=150, bg="#f0f0f0", relief=tk.RAISED, bd=2)
@@ -42,17 +67,15 @@ class ProfessionalCandlestickApp(tk.Tk):
         
         # Выпадающий список методов предсказания
         self.method_var = tk.StringVar()
-        methods = ["ARIMA", "LSTM", "Prophet", "SVM", "XGBoost", "Горизонтальные уровни"]
         self.method_combo = ttk.Combobox(
             left_panel,
             textvariable=self.method_var,
-            values=methods,
-            state="readonly",
+            state=tk.DISABLED,  # Список методов заполняется после импорта модулей прогноза
             width=15,
             height=10
         )
-        self.method_combo.current(0)
         self.method_combo.pack(pady=5, padx=10)
+        self.chart_controls.append((self.method_combo, "readonly"))
         
         # Кнопка настроек метода
         self.btn_settings = tk.Button(
@@ -63,9 +86,40 @@ class ProfessionalCandlestickApp(tk.Tk):
             bg="#e0e0e0",
             relief=tk.FLAT,
             font=("Arial", 9),
+            state=tk.DISABLED,
             command=self.open_settings
         )
         self.btn_settings.pack(pady=5, padx=10)
+        self.chart_controls.append((self.btn_settings, tk.NORMAL))
+        
+        # Кнопки запуска и отмены прогноза (доступны, как и список методов, после создания графика)
+        self.btn_forecast = tk.Button(
+            left_panel,
+            text="Прогноз",
+            width=12,
+            height=1,
+            bg="#e0e0e0",
+            relief=tk.FLAT,
+            font=("Arial", 9),
+            state=tk.DISABLED,
+            command=self.run_forecast
+        )
+        self.btn_forecast.pack(pady=5, padx=10)
+        self.chart_controls.append((self.btn_forecast, tk.NORMAL))
+        
+        self.btn_cancel_forecast = tk.Button(
+            left_panel,
+            text="Отменить прогноз",
+            width=12,
+            height=1,
+            bg="#e0e0e0",
+            relief=tk.FLAT,
+            font=("Arial", 9),
+            state=tk.DISABLED,
+            command=self.cancel_forecast
+        )
+        self.btn_cancel_forecast.pack(pady=5, padx=10)
+        self.chart_controls.append((self.btn_cancel_forecast, tk.NORMAL))
         
         # Разделитель
         separator = ttk.Separator(left_panel, orient='horizontal')
@@ -81,179 +135,245 @@ class ProfessionalCandlestickApp(tk.Tk):
         )
         lbl_params.pack(pady=(10, 5), padx=10)
         
+        # Выпадающий список инструментов (переключение без перезагрузки данных)
+        self.symbol_var = tk.StringVar()
+        self.symbol_combo = ttk.Combobox(
+            left_panel,
+            textvariable=self.symbol_var,
+            state=tk.DISABLED,
+            width=15
+        )
+        self.symbol_combo.pack(pady=5, padx=10)
+        self.symbol_combo.bind("<<ComboboxSelected>>", self.on_symbol_change)
+        self.chart_controls.append((self.symbol_combo, "readonly"))
+        
         # Выпадающий список таймфреймов
         self.timeframe_var = tk.StringVar()
-        timeframes = ["1 минута", "5 минут", "15 минут", "30 минут", "1 час", "4 часа", "1 день"]
         timeframe_combo = ttk.Combobox(
             left_panel,
             textvariable=self.timeframe_var,
-            values=timeframes,
-            state="readonly",
+            values=list(TIMEFRAMES),
+            state=tk.DISABLED,
             width=15
         )
         timeframe_combo.current(0)
         timeframe_combo.pack(pady=5, padx=10)
+        timeframe_combo.bind("<<ComboboxSelected>>", self.on_timeframe_change)
+        self.chart_controls.append((timeframe_combo, "readonly"))
+        
+        # Линии EMA на графике
+        self.indicators_var = tk.BooleanVar(value=True)
+        indicators_check = tk.Checkbutton(
+            left_panel,
+            text="Индикаторы (EMA)",
+            variable=self.indicators_var,
+            bg="#f0f0f0",
+            font=("Arial", 9),
+            state=tk.DISABLED,
+            command=self.on_indicators_toggle
+        )
+        indicators_check.pack(pady=5, padx=10)
+        self.chart_controls.append((indicators_check, tk.NORMAL))
+        
+        # Отладочная строка метрик (время загрузки, разбора, слияния и отрисовки) в статус баре
+        self.metrics_var = tk.BooleanVar(value=False)
+        metrics_check = tk.Checkbutton(
+            left_panel,
+            text="Метрики (отладка)",
+            variable=self.metrics_var,
+            bg="#f0f0f0",
+            font=("Arial", 9),
+            command=self.on_metrics_toggle
+        )
+        metrics_check.pack(pady=5, padx=10)
         
         # Создание основной области для графика и элементов управления
         main_frame = tk.Frame(self)
         main_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=5, pady=5)
         
         # Создание фрейма для инструментов графика
-        toolbar_frame = tk.Frame(main_frame, height=30)
-        toolbar_frame.pack(fill=tk.X, pady=(0, 5))
+        self.toolbar_frame = tk.Frame(main_frame, height=30)
+        self.toolbar_frame.pack(fill=tk.X, pady=(0, 5))
         
         # Создание фрейма для графика
-        graph_frame = tk.Frame(main_frame, bg='white')
-        graph_frame.pack(fill=tk.BOTH, expand=True)
+        self.graph_frame = tk.Frame(main_frame, bg='white')
+        self.graph_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # Статус бар (размещаем в главном окне, а не во фрейме)
+        self.status_var = tk.StringVar(value="Запуск...")
+        self.status_bar = tk.Label(self, textvariable=self.status_var, bd=1, 
+                            relief=tk.SUNKEN, anchor=tk.W, bg="#e0e0e0", font=("Arial", 9))
+        self.status_bar.pack(side=tk.BOTTOM, fill=tk.X, before=left_panel)  # Размещаем до левой панели
+        self.metrics_text = tk.StringVar()
+        self.metrics_bar = tk.Label(self, textvariable=self.metrics_text, bd=1, relief=tk.SUNKEN,
+                                    anchor=tk.W, bg="#fff8dc", font=("Consolas", 8))
+        self.metrics_job = None
+        
+        # Окно показывается сразу; модули графика и данные подключаются после первого кадра
+        self.update()
+        registry.gauge('startup.first_frame_ms', (time.time() - registry.started) * 1000)
+        self.after(0, self.init_chart)
+        
+    def init_chart(self):
+        """Импорт модулей, создание графика и запуск фоновой загрузки истории.
+
+        История всех инструментов читается в фоне: сначала свечи из локального
+        хранилища (Preview), затем догруженная с биржи полная история - обе
+        приходят через очередь, и график перерисовывается по мере поступления.
+        """
+        with registry.timer('startup.imports'):
+            import_chart_modules()
+        
+        # Фоновые потоки передают данные главному потоку только через очередь
+        self.bus = DataBus()
+        # Отслеживаемые инструменты: у каждого свои буфер свечей и кэш таймфреймов
+        if REPLAY_SOURCE:
+            # Запись вместо биржи - через ту же очередь, слияние, прогнозы и отрисовку
+            self.watchlist = ReplayWatchlist(
+                self.bus, on_finished=lambda: self.bus.call(self.status_var.set, "Воспроизведение завершено"))
+        else:
+            self.watchlist = Watchlist(self.bus)
+        self.select_instrument(self.watchlist.get((CATEGORY, SYMBOL)))
+        self.awaited_instrument = self.instrument
+        
+        self.method_combo.configure(values=available_methods())  # Из реестра методов прогнозирования
+        self.method_combo.current(0)
+        self.symbol_combo.configure(values=[instrument.label for instrument in self.watchlist])
+        self.symbol_var.set(self.instrument.label)
         
         # Создание фигуры и осей для графика
         self.fig = Figure(figsize=(10, 6), dpi=100)
         self.ax = self.fig.add_subplot(111)
+        self.renderer = CandlestickRenderer(self.ax)
+        self.lod = OHLCPyramid()  # Уровни детализации свечей для длинной истории
+        self.lod_view = None      # Отрисованный срез пирамиды: (уровень, начало, конец)
+        self.forecast_overlay = ForecastOverlay(self.ax)
+        self.indicator_overlay = IndicatorOverlay(self.ax)
+        self.forecast_runner = ForecastRunner(cache=ForecastCache())  # Пул процессов для прогнозов
+        self.forecast_method = None  # Метод активного прогноза (обновляется с новыми свечами)
+        self.forecast_key = None     # Ключ кэша последнего запрошенного прогноза
         
         # Встраивание графика в Tkinter
-        self.canvas = FigureCanvasTkAgg(self.fig, master=graph_frame)
+        self.canvas = TimedCanvas(self.fig, master=self.graph_frame)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
         
         # Добавление панели инструментов для графика
-        self.toolbar = NavigationToolbar2Tk(self.canvas, toolbar_frame, pack_toolbar=False)
+        self.toolbar = NavigationToolbar2Tk(self.canvas, self.toolbar_frame, pack_toolbar=False)
         self.toolbar.update()
         self.toolbar.pack(fill=tk.X)
         
         # Убрать отображение координат в правом верхнем углу
         self.ax.format_coord = lambda x, y: ""
         
-        # Статус бар (размещаем в главном окне, а не во фрейме)
-        self.status_var = tk.StringVar(value="Готов к работе")
-        status_bar = tk.Label(self, textvariable=self.status_var, bd=1, 
-                            relief=tk.SUNKEN, anchor=tk.W, bg="#e0e0e0", font=("Arial", 9))
-        status_bar.pack(side=tk.BOTTOM, fill=tk.X, before=left_panel)  # Размещаем до левой панели
-        
-        # Инициализация графика
+        # Инициализация графика (до прихода истории - надпись о загрузке)
         self.plot_candlestick()
+        self.status_var.set(f"Загрузка истории {self.instrument.label}...")
+        for widget, state in self.chart_controls:
+            widget.configure(state=state)
         
         # Подключение обработчика движения мыши
         self.canvas.mpl_connect('motion_notify_event', self.on_hover)
 
-        # Запуск потока обновления
-        self.update_thread = threading.Thread(target=self.update_data, daemon=True)
-        self.update_thread.start()
-        
-    def load_live_data(self, initial_load=True):
-        """Загрузка данных с биржи с оптимизацией"""
+        # Запуск стримов свечей (WebSocket по категориям), фоновой загрузки и резервного опроса REST
+        self.watchlist.start()
+        self.metrics_exporters = start_exporters()
+        self.after(BUS_POLL_MS, self.process_bus)
+        
+    def select_instrument(self, instrument):
+        """Инструмент графика: свечи, таймфреймы и хранилище берутся из его буферов"""
+        self.instrument = instrument
+        self.candles = instrument.candles
+        self.timeframes = instrument.timeframes
+        self.store = instrument.store
+        self.indicator_series = {}  # Таймфрейм -> индикаторы его свечей
+
+    def process_bus(self):
+        """Разбор очереди данных в главном потоке: свечи применяются в data.dispatch, окно
+        получает уведомления on_preview, on_history и on_update
+        """
         try:
-            if initial_load:
-                # Первоначальная загрузка полного набора данных
-                raw_data = fetch_bybit_candles()
-                df = prepare_prophet_data(raw_data)
-                
-                if not df.empty:
-                    self.last_timestamp = df['timestamp'].max()
-                
-                return df
-            else:
-                # Последующие обновления - только новые данные
-                if not self.last_timestamp:
-                    return self.load_live_data(initial_load=True)
-                
-                # Загружаем только последние 5 минут (на случай пропущенных свечей)
-                raw_data = fetch_recent_candles(self.last_timestamp)
-                if raw_data.empty:
-                    return pd.DataFrame()
-                
-                new_df = prepare_prophet_data(raw_data)
-                
-                # Фильтруем только действительно новые данные
-                new_df = new_df[new_df['timestamp'] > self.last_timestamp]
-                
-                if not new_df.empty:
-                    self.last_timestamp = new_df['timestamp'].max()
-                
-                return new_df
-                
-        except Exception as e:
-            print(f"Ошибка загрузки данных: {str(e)}")
-            return pd.DataFrame()
-
-    def update_data(self):
-        """Поток для обновления данных"""
-        # Первоначальная загрузка уже сделана в __init__, ждем 60 секунд
-        time.sleep(20)
-        
-        while True:
-            try:
-                # Загружаем только новые данные
-                new_df = self.load_live_data(initial_load=False)
-                
-                if not new_df.empty:
-                    # Объединяем новые данные с существующими
-                    self.df = pd.concat([self.df, new_df]).drop_duplicates(subset=['timestamp'], keep='last')
-                    self.df.sort_values('ds', inplace=True)
-                    
-                    # Обновляем график
-                    self.after(0, self.plot_candlestick)
-                    self.update_status()
-                
-                # Пауза 60 секунд
-                time.sleep(20)
-            except Exception as e:
-                self.status_var.set(f"Ошибка обновления: {str(e)}")
-                time.sleep(10)
-    
+            dispatch_events(self.bus, self.watchlist, self)
+        finally:
+            self.after(BUS_POLL_MS, self.process_bus)
+
+    def on_preview(self, instrument):
+        """Свечи инструмента из локального хранилища - показываются, пока догружается история"""
+        if instrument is self.awaited_instrument:
+            self.switch_instrument(instrument)
+            self.status_var.set(f"Загрузка истории {instrument.label}...")
+
+    def on_history(self, instrument):
+        """История инструмента загружена в фоне (заменяет показанные свечи из хранилища)"""
+        if instrument is self.awaited_instrument:
+            self.awaited_instrument = None
+            self.switch_instrument(instrument)
+
+    def on_update(self, instrument, changed):
+        """Свечи инструмента добавлены или изменены (стрим, REST, догрузка пропуска)"""
+        if instrument is self.instrument:
+            self.update_chart(changed)
+
+    def on_symbol_change(self, event=None):
+        """Переключение инструмента: данные уже в памяти, если история загружена в фоне"""
+        instrument = self.watchlist.by_label(self.symbol_var.get())
+        if instrument is self.instrument:
+            return
+        if not instrument.loaded:
+            # Полный график - когда история придет через очередь, до этого - свечи из хранилища
+            self.awaited_instrument = instrument
+            self.watchlist.load(instrument)
+            if instrument.previewed:
+                self.switch_instrument(instrument)
+            self.status_var.set(f"Загрузка истории {instrument.label}...")
+            return
+        self.awaited_instrument = None
+        self.switch_instrument(instrument)
+
+    def switch_instrument(self, instrument):
+        """Показ другого инструмента из памяти"""
+        # Прогноз относился к прежнему инструменту
+        self.cancel_forecast()
+        self.forecast_overlay.clear()
+        self.select_instrument(instrument)
+        self.indicator_overlay.clear()
+        
+        self.lod_view = None
+        self.xlim = None
+        self.ylim = None
+        self.plot_candlestick()
+
     def plot_candlestick(self):
         """Построение свечного графика с обработкой пустых данных"""
-        if self.ax.lines:  # Если на графике уже есть данные
+        if self.lod_view is not None:  # Если на графике уже есть данные
             self.xlim = self.ax.get_xlim()
             self.ylim = self.ax.get_ylim()
         
         self.ax.clear()
+        self.renderer.remove()  # Коллекции свечей удалены вместе с осями
         
-        if self.df.empty:
+        candles = self.chart_candles()
+        if candles.empty:
+            self.lod_view = None
             # Отображаем сообщение об отсутствии данных
-            self.ax.text(0.5, 0.5, "Нет данных для отображения", 
+            message = "Нет данных для отображения" if self.instrument.loaded else "Загрузка истории..."
+            self.ax.text(0.5, 0.5, message, 
                          ha='center', va='center', fontsize=12)
             self.canvas.draw()
             return
         
         # Преобразование времени в числовой формат Matplotlib
-        dates = mdates.date2num(self.df['ds'])
+        dates = timestamps_to_num(candles.timestamp)
         
         # Рассчет пределов для осей
-        min_low = self.df['low'].min()
-        max_high = self.df['high'].max()
+        min_low = candles.low.min()
+        max_high = candles.high.max()
         price_range = max_high - min_low
         y_min = min_low - price_range * 0.05
         y_max = max_high + price_range * 0.05
         
-        # Определение ширины свечи (автоматическая)
-        # Вычисляем средний интервал между свечами
-        time_diffs = np.diff(dates)
-        avg_time_diff = np.mean(time_diffs) if len(time_diffs) > 0 else 0.001
-        width = avg_time_diff * 0.7  # 70% от среднего интервала
-        
-        # Построение свечей
-        for i in range(len(dates)):
-            t = dates[i]
-            open_price = self.df['open'].iloc[i]
-            close_price = self.df['close'].iloc[i]
-            high_price = self.df['high'].iloc[i]
-            low_price = self.df['low'].iloc[i]
-            
-            # Определение цвета свечи
-            color = '#2ecc71' if close_price >= open_price else '#e74c3c'  # Зеленый/красный
-            
-            # Построение тени (вертикальная линия)
-            self.ax.plot([t, t], [low_price, high_price], 
-                        color=color, linewidth=1, solid_capstyle='round')
-            
-            # Построение тела свечи
-            self.ax.bar(
-                t, 
-                abs(close_price - open_price), 
-                bottom=min(open_price, close_price),
-                width=width,
-                color=color,
-                edgecolor=color
-            )
+        # Пирамида уровней детализации, рисуются только видимые свечи
+        self.lod.build(np.column_stack([dates, candles.open, candles.high, candles.low, candles.close]))
+        avg_time_diff = candle_width(dates)[1]
         
         # Настройка осей
         self.ax.set_ylim(y_min, y_max)
@@ -263,7 +383,7 @@ class ProfessionalCandlestickApp(tk.Tk):
         self.ax.grid(True, linestyle='--', alpha=0.3)
         
         # Форматирование оси времени
-        self.ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
+        self.ax.xaxis.set_major_formatter(mdates.DateFormatter(self.date_format()))
         
         # Автоматическое форматирование дат
         self.fig.autofmt_xdate(rotation=0, ha='center')
@@ -271,57 +391,200 @@ class ProfessionalCandlestickApp(tk.Tk):
         # Установка правильных пределов по времени
         self.ax.set_xlim(min(dates) - avg_time_diff, max(dates) + avg_time_diff)
         
-        # Перерисовка
-        self.canvas.draw()
-        
-        # Обновление статуса
-        self.update_status()
-    
         # Восстанавливаем масштаб, если он был сохранен
         if self.xlim and self.ylim:
             self.ax.set_xlim(self.xlim)
             self.ax.set_ylim(self.ylim)
         
+        # Построение свечей (тени и тела - коллекциями, без артиста на каждую свечу)
+        self.render_visible(force=True)
+        self.ax.callbacks.connect('xlim_changed', self.on_xlim_changed)
+        self.forecast_overlay.draw()
+        
+        # Перерисовка
         self.canvas.draw()
+        
+        # Обновление статуса; индексы свечей могли сместиться - наведение пересчитается заново
+        self.hover_index = None
+        self.update_status()
 
-    def on_hover(self, event):
-        """Обработчик движения мыши для обновления статус бара"""
-        if event.inaxes == self.ax:
-            x = event.xdata
-            # Преобразование координаты X во время
-            hover_time = mdates.num2date(x)
-            
-            # Поиск ближайшей свечи
-            idx = self.find_nearest_candle(hover_time)
-            
-            if idx is not None:
-                candle = self.df.iloc[idx]
-                self.update_status(candle)
-
-    def find_nearest_candle(self, target_time):
-        """Поиск индекса ближайшей свечи к указанному времени"""
-        # Если target_time содержит информацию о часовом поясе, преобразуем в наивное время
-        if target_time.tzinfo is not None:
-            target_time = target_time.replace(tzinfo=None)
-        
-        times = self.df['ds'].values
-        if len(times) == 0:
-            return None
-            
-        # Преобразование в numpy datetime64 для сравнения
-        target_np = np.datetime64(target_time)
-        times_np = np.array(times, dtype='datetime64[ns]')
+    def update_chart(self, new_candles):
+        """Инкрементальное обновление графика: правка последней свечи и добавление новых без ax.clear().
+
+        new_candles - колонки добавленных/измененных минутных свечей.
+        """
+        if self.lod_view is None:
+            self.plot_candlestick()
+            return
         
-        # Вычисление разницы времени
-        time_diffs = np.abs(times_np - target_np)
-        min_idx = np.argmin(time_diffs)
+        # Свечи текущего таймфрейма, затронутые новыми минутными данными
+        candles = self.chart_candles()
+        first = int(new_candles['timestamp'].min())
+        step_ms = self.timeframe * 60 * 1000
+        start = np.searchsorted(candles.timestamp, first - first % step_ms)
+        
+        rows = np.column_stack([
+            timestamps_to_num(candles.timestamp[start:]),
+            candles.open[start:],
+            candles.high[start:],
+            candles.low[start:],
+            candles.close[start:]
+        ])
+        
+        # Масштаб и оформление осей не трогаем - пользовательский зум сохраняется
+        level, lo, hi = self.lod_view
+        drawn_to_end = level == 0 and hi == len(self.lod)
+        self.lod.update(rows)
+        if drawn_to_end:
+            # Отрисованы подробные свечи до последней - правим и дописываем только их
+            self.renderer.update(*rows.T)
+            self.lod_view = (0, lo, len(self.lod))
+            self.draw_indicators()
+            self.canvas.draw_idle()
+        elif len(rows) and rows[0, 0] <= self.ax.get_xlim()[1]:
+            # Изменения попали в видимую область другого уровня детализации
+            self.render_visible(force=True)
+            self.canvas.draw_idle()
+        self.hover_index = None
+        self.update_status()
+        
+        # Активный прогноз обновляется, когда закрывается новая свеча
+        if self.forecast_method:
+            self.run_forecast(auto=True)
+
+    def render_visible(self, force=False):
+        """Отрисовка видимых свечей на уровне детализации, подобранном по ширине оси в пикселях"""
+        x_min, x_max = self.ax.get_xlim()
+        max_candles = max(int(self.ax.bbox.width / LOD_PIXELS_PER_CANDLE), 1)
+        level, lo, hi, rows = self.lod.select(x_min, x_max, max_candles)
+        if not force and (level, lo, hi) == self.lod_view:
+            return False
+        
+        self.lod_view = (level, lo, hi)
+        self.renderer.draw(*rows.T)
+        self.draw_indicators()
+        return True
+
+    def draw_indicators(self):
+        """Линии EMA видимого диапазона, прореженные до ширины оси в пикселях"""
+        if not self.indicators_var.get():
+            self.indicator_overlay.clear()
+            return
         
-        return min_idx
+        candles = self.chart_candles()
+        series = self.chart_indicators()
+        ts = candles.timestamp
+        t_min, t_max = num_to_timestamps(self.ax.get_xlim())
+        lo = max(np.searchsorted(ts, t_min) - 1, 0)
+        hi = min(np.searchsorted(ts, t_max, side='right') + 1, len(ts))
+        step = max((hi - lo) // max(int(self.ax.bbox.width / LOD_PIXELS_PER_CANDLE), 1), 1)
+        names = [name for name in series.values.fields if name.startswith('ema_')]
+        self.indicator_overlay.draw(ts[lo:hi:step], {name: series.column(name)[lo:hi:step] for name in names})
+
+    def on_indicators_toggle(self):
+        """Включение/выключение линий индикаторов"""
+        self.draw_indicators()
+        self.canvas.draw_idle()
+
+    def on_metrics_toggle(self):
+        """Показ/скрытие отладочной строки метрик под статус баром"""
+        if self.metrics_var.get():
+            self.metrics_bar.pack(side=tk.BOTTOM, fill=tk.X, before=self.status_bar)
+            self.show_metrics()
+        else:
+            self.metrics_bar.pack_forget()
+            if self.metrics_job is not None:
+                self.after_cancel(self.metrics_job)
+                self.metrics_job = None
+
+    def show_metrics(self):
+        """Обновление отладочной строки раз в METRICS_OVERLAY_MS"""
+        self.metrics_text.set(summary_line(registry.snapshot()))
+        self.metrics_job = self.after(METRICS_OVERLAY_MS, self.show_metrics)
+
+    def on_xlim_changed(self, ax):
+        """Масштабирование/прокрутка: перерисовываем, только если изменился набор видимых свечей"""
+        if self.render_visible():
+            self.canvas.draw_idle()
+
+    def chart_candles(self):
+        """Буфер свечей выбранного таймфрейма"""
+        return self.timeframes.get(self.timeframe)
+
+    def chart_indicators(self):
+        """Индикаторы свечей выбранного таймфрейма (досчитываются по новым свечам)"""
+        candles = self.chart_candles()
+        series = self.indicator_series.get(self.timeframe)
+        if series is None or series.source is not candles:
+            series = self.indicator_series[self.timeframe] = IndicatorSeries(candles)
+        series.sync()
+        return series
+
+    def date_format(self):
+        """Формат подписей оси времени для текущего таймфрейма"""
+        if self.timeframe >= 1440:
+            return '%d.%m'
+        if self.timeframe >= 60:
+            return '%d.%m %H:%M'
+        return '%H:%M'
+
+    def on_timeframe_change(self, event=None):
+        """Переключение таймфрейма: свечи берутся из кэша агрегатора, без запросов к API"""
+        self.timeframe = TIMEFRAMES[self.timeframe_var.get()]
+        
+        # Прогноз относился к прежнему таймфрейму
+        self.cancel_forecast()
+        self.forecast_overlay.clear()
+        
+        # Масштаб прежнего таймфрейма не подходит - показываем весь график
+        self.lod_view = None
+        self.xlim = None
+        self.ylim = None
+        self.plot_candlestick()
+
+    def on_hover(self, event):
+        """Обработчик движения мыши: статус бар обновляется не чаще одного раза за кадр"""
+        if event.inaxes != self.ax or event.xdata is None:
+            return
+        idx = self.find_nearest_candle(event.xdata)
+        if idx is None or idx == self.hover_index:
+            return
+        
+        # Свеча под курсором запоминается, строка статуса собирается один раз за кадр
+        self.hover_index = idx
+        if self.hover_job is None:
+            self.hover_job = self.after(STATUS_FRAME_MS, self.show_hover)
+
+    def show_hover(self):
+        """Статус для последней свечи под курсором"""
+        self.hover_job = None
+        candles = self.chart_candles()
+        if self.hover_index is None or self.hover_index >= len(candles):
+            return
+        candle = candles.row(self.hover_index)
+        candle['rsi'] = self.chart_indicators().column('rsi')[self.hover_index]
+        self.update_status(candle)
+
+    def find_nearest_candle(self, x):
+        """Индекс ближайшей к координате x свечи: двоичный поиск по меткам времени буфера.
+
+        Метки (int64, по возрастанию) - представление буфера без копирования,
+        поэтому индекс не пересобирается на каждое движение мыши.
+        """
+        ts = self.chart_candles().timestamp
+        if len(ts) == 0:
+            return None
+        target = num_to_timestamps(x)
+        pos = int(np.searchsorted(ts, target))
+        if pos == len(ts) or (pos > 0 and target - ts[pos - 1] <= ts[pos] - target):
+            pos -= 1
+        return pos
 
     def update_status(self, candle=None):
         """Обновление статус бара с данными свечи"""
         if candle is None:
-            candle = self.df.iloc[-1]
+            candle = self.chart_candles().row(-1)
+            candle['rsi'] = self.chart_indicators().column('rsi')[-1]
             
         status_text = (
             f"Время: {candle['ds'].strftime('%H:%M:%S')} | "
@@ -330,8 +593,68 @@ class ProfessionalCandlestickApp(tk.Tk):
             f"Макс: {candle['high']:.2f} | "
             f"Мин: {candle['low']:.2f}"
         )
+        if 'rsi' in candle:
+            status_text += f" | RSI: {candle['rsi']:.1f}"
         self.status_var.set(status_text)
 
+    def run_forecast(self, auto=False):
+        """Запуск прогноза в пуле процессов по закрытым свечам текущего таймфрейма.
+
+        auto=True - обновление активного прогноза на тике: пересчет только при появлении
+        новой закрытой свечи, повторные запросы с тем же ключом берутся из кэша.
+        """
+        method = self.forecast_method if auto else self.method_var.get()
+        candles = self.chart_candles()
+        if not method or candles.empty:
+            return
+        
+        settings = {}
+        request = closed_forecast_key(self.instrument.label, self.timeframe, candles.timestamp, method, settings,
+                                      FORECAST_PERIODS)
+        if request is None:
+            return
+        closed, key = request
+        if auto and key == self.forecast_key:
+            return
+        self.forecast_method = method
+        self.forecast_key = key
+        
+        self.status_var.set(f"Расчет прогноза: {method}...")
+        self.forecast_runner.submit(
+            method, settings, candles.timestamp[:closed], candles.close[:closed], FORECAST_PERIODS,
+            on_done=lambda result: self.bus.call(self.show_forecast, result),
+            on_error=lambda error: self.bus.call(self.on_forecast_error, error),
+            cache_key=key
+        )
+
+    def on_forecast_error(self, error):
+        """Ошибка прогноза: автообновление останавливается, чтобы не повторять ошибку на каждой свече"""
+        self.forecast_method = None
+        self.forecast_key = None
+        self.status_var.set(f"Ошибка прогноза: {str(error)}")
+
+    def show_forecast(self, result):
+        """Наложение готового прогноза на график"""
+        self.forecast_overlay.show(result)
+        
+        # Если виден конец истории - расширяем ось времени до конца прогноза
+        if result.kind == 'series':
+            x_min, x_max = self.ax.get_xlim()
+            last_date, forecast_end = timestamps_to_num(
+                [result.timestamp, result.timestamp + (len(result.values) + 1) * result.step_ms])
+            if last_date <= x_max < forecast_end:
+                self.ax.set_xlim(x_min, forecast_end)
+        self.canvas.draw_idle()
+        self.status_var.set(f"Прогноз готов: {result.method}")
+
+    def cancel_forecast(self):
+        """Отмена рассчитываемого прогноза и его автоматического обновления"""
+        self.forecast_method = None
+        self.forecast_key = None
+        if self.forecast_runner.busy:
+            self.forecast_runner.cancel()
+            self.status_var.set("Прогноз отменен")
+
     def open_settings(self):
         """Открытие окна настроек для выбранного метода"""
         selected_method = self.method_var.get()
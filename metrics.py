@@ -0,0 +1,220 @@
+"""Метрики горячих путей: счетчики, показатели и гистограммы длительностей.
+
+Загрузка (fetch), разбор (parse), слияние свечей (merge) и перерисовка (draw)
+пишут сюда время и объемы; снимок доступен периодическим JSON-логом,
+локальным HTTP-адресом и отладочной строкой в статус баре приложения.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import METRICS_LOG_PATH, METRICS_LOG_INTERVAL, METRICS_PORT
+
+# Верхние границы корзин гистограммы в мс: 0.05 мс ... ~52 с, каждая вдвое больше предыдущей
+BUCKETS_MS = tuple(0.05 * 2 ** i for i in range(21))
+
+
+class Histogram:
+    """Гистограмма длительностей (мс) с логарифмическими корзинами: O(1) памяти на любое число замеров"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.buckets[bisect.bisect_left(BUCKETS_MS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Оценка квантиля - верхняя граница корзины (не больше максимума)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(BUCKETS_MS[i], self.max) if i < len(BUCKETS_MS) else self.max
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'max': self.max,
+            'buckets': dict(zip([*map(str, BUCKETS_MS), 'inf'], self.buckets))
+        }
+
+
+class Metrics:
+    """Потокобезопасный реестр метрик процесса"""
+
+    def __init__(self):
+        self.counters = {}    # Накопительные счетчики: запросы, байты, свечи, потери
+        self.gauges = {}      # Текущие значения: глубина очереди и т.п.
+        self.histograms = {}  # Длительности в мс
+        self.started = time.time()
+        self.lock = threading.Lock()
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name, value):
+        with self.lock:
+            self.gauges[name] = value
+
+    def observe(self, name, ms):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(ms)
+
+    @contextmanager
+    def timer(self, name):
+        """Замер длительности блока with в гистограмму name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000)
+
+    def timed(self, name):
+        """Декоратор: замер длительности каждого вызова функции"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        """Текущие значения всех метрик (словарь для JSON)"""
+        with self.lock:
+            return {
+                'time': time.time(),
+                'uptime': time.time() - self.started,
+                'counters': dict(self.counters),
+                'gauges': dict(self.gauges),
+                'timings': {name: histogram.summary() for name, histogram in self.histograms.items()}
+            }
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+            self.started = time.time()
+
+
+# Общий реестр: пишут все потоки процесса (процессы пула прогнозов ведут свои копии)
+registry = Metrics()
+
+
+def summary_line(snapshot, stages=('fetch', 'parse', 'merge', 'draw', 'forecast', 'replay.lag')):
+    """Краткая строка для статус бара: p95 этапов в мс и счетчики потерь"""
+    parts = []
+    for stage in stages:
+        timing = snapshot['timings'].get(stage)
+        if timing:
+            parts.append(f"{stage} p95 {timing['p95']:.1f} мс ×{timing['count']}")
+    counters = snapshot['counters']
+    parts.append(f"запросов {counters.get('fetch.requests', 0)} (повторов {counters.get('fetch.retries', 0)})")
+    parts.append(f"WS {counters.get('stream.messages', 0)}")
+    parts.append(f"потеряно {counters.get('bus.dropped', 0)}")
+    return " | ".join(parts)
+
+
+class MetricsLog:
+    """Периодическая запись снимков метрик в файл (одна JSON-строка на снимок)"""
+
+    def __init__(self, path=METRICS_LOG_PATH, interval=METRICS_LOG_INTERVAL, metrics=registry):
+        self.path = path
+        self.interval = interval
+        self.metrics = metrics
+        self._stop = threading.Event()
+
+    def start(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.write()
+
+    def write(self):
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(self.metrics.snapshot(), ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"Ошибка записи метрик: {str(e)}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip('/') != '/metrics':
+            self.send_error(404)
+            return
+        body = json.dumps(self.server.metrics.snapshot(), ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """Снимок метрик по HTTP: GET http://127.0.0.1:<port>/metrics (только локальный адрес)"""
+
+    daemon_threads = True
+
+    def __init__(self, port=METRICS_PORT, metrics=registry):
+        super().__init__(('127.0.0.1', port), MetricsHandler)
+        self.metrics = metrics
+        self.url = f"http://127.0.0.1:{self.server_address[1]}/metrics"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def start_exporters():
+    """Запуск выгрузки метрик, включенной в config (METRICS_LOG_PATH, METRICS_PORT)"""
+    exporters = []
+    if METRICS_LOG_PATH:
+        exporters.append(MetricsLog().start())
+    if METRICS_PORT is not None:
+        try:
+            server = MetricsServer().start()
+            print(f"Метрики: {server.url}")
+            exporters.append(server)
+        except OSError as e:
+            print(f"Не удалось открыть порт метрик {METRICS_PORT}: {str(e)}")
+    return exporters
@@ -0,0 +1,39 @@
+import threading
+import time
+import numpy as np
+from data import bus as bus_module
+from data.bus import CandleBatch, DataBus, Hold, coalesce_columns
+
+KEY = ("linear", "BTCUSDT")
+
+
+def batch(*timestamps, close=1.0, **flags):
+    return CandleBatch(KEY, {'timestamp': np.array(timestamps, dtype=np.int64),
+                             'close': np.full(len(timestamps), close)}, False, **flags)
+
+
+def test_full_queue_drops_ticks_but_keeps_hold_before_backfill(monkeypatch):
+    monkeypatch.setattr(bus_module, 'BUS_PUT_TIMEOUT', 0.05)
+    bus = DataBus(maxsize=2)
+    assert bus.publish(batch(1)) and bus.publish(batch(2))
+    assert not bus.publish(batch(3))  # Обычная свеча при переполнении отбрасывается
+    assert bus.dropped == 1
+
+    # Как Watchlist._refresh и _fetch: начало догрузки, затем ее результат - оба ждут места
+    publisher = threading.Thread(target=lambda: (bus.publish(Hold(KEY)), bus.publish(batch(2, 3, backfill=True))))
+    publisher.start()
+    events = []
+    while publisher.is_alive() or not bus.queue.empty():
+        time.sleep(0.1)
+        events.extend(bus.drain())
+    publisher.join()
+
+    assert bus.dropped == 1
+    assert [type(event).__name__ for event in events] == ['CandleBatch', 'CandleBatch', 'Hold', 'CandleBatch']
+    assert events[-1].backfill
+
+
+def test_coalesce_keeps_latest_version_of_candle():
+    merged = coalesce_columns([batch(1, 2).columns, batch(2, 3, close=2.0).columns])
+    assert merged['timestamp'].tolist() == [1, 2, 3]
+    assert merged['close'].tolist() == [1.0, 2.0, 2.0]
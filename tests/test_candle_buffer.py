@@ -0,0 +1,56 @@
+import numpy as np
+from data.candle_buffer import CandleBuffer
+
+FIELDS = ('timestamp', 'close')
+
+
+def columns(timestamps, offset=0.0):
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    return {'timestamp': timestamps, 'close': timestamps + offset}
+
+
+def test_wraparound_keeps_last_capacity_candles_in_order():
+    buffer = CandleBuffer(capacity=4, fields=FIELDS)
+    # Больше 2 * capacity добавлений - живой срез несколько раз переносится в начало массива
+    for timestamp in range(11):
+        assert buffer.upsert(timestamp, float(timestamp))
+        assert len(buffer) == min(timestamp + 1, 4)
+        assert buffer.timestamp.tolist() == list(range(max(timestamp - 3, 0), timestamp + 1))
+        assert np.array_equal(buffer.close, buffer.timestamp)
+
+
+def test_extend_larger_than_capacity_keeps_newest():
+    buffer = CandleBuffer(capacity=4, fields=FIELDS)
+    buffer.extend(columns([0, 1]))
+    buffer.extend(columns(range(2, 12)))
+    assert buffer.timestamp.tolist() == [8, 9, 10, 11]
+    assert buffer.last_timestamp == 11
+
+
+def test_upsert_replaces_existing_and_rejects_missing_older():
+    buffer = CandleBuffer(capacity=8, fields=FIELDS)
+    buffer.extend(columns([10, 20, 30]))
+    version = buffer.version
+
+    assert buffer.upsert(30, 1.0)  # Правка формирующейся свечи
+    assert buffer.upsert(10, 2.0)  # Правка более старой свечи
+    assert not buffer.upsert(15, 3.0)  # Старше последней и отсутствует
+    assert buffer.timestamp.tolist() == [10, 20, 30]
+    assert buffer.close.tolist() == [2.0, 20.0, 1.0]
+    assert buffer.version == version + 2
+
+
+def test_extend_mixes_updates_and_new_candles():
+    buffer = CandleBuffer(capacity=4, fields=FIELDS)
+    buffer.extend(columns([1, 2, 3]))
+    buffer.extend(columns([3, 4, 5], offset=0.5))
+    assert buffer.timestamp.tolist() == [2, 3, 4, 5]
+    assert buffer.close.tolist() == [2.0, 3.5, 4.5, 5.5]
+
+
+def test_columns_are_read_only_views():
+    buffer = CandleBuffer(capacity=4, fields=FIELDS, dtype='float32')
+    buffer.extend(columns([1, 2]))
+    close = buffer.close
+    assert close.dtype == np.float32 and not close.flags.writeable
+    assert buffer.nbytes == 2 * 4 * (8 + 4)
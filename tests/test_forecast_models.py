@@ -0,0 +1,31 @@
+import numpy as np
+from forecast.models import ArimaForecaster
+
+STEP_MS = 60_000
+
+
+def series(count, seed=1):
+    rng = np.random.default_rng(seed)
+    timestamp = np.arange(count, dtype=np.int64) * STEP_MS
+    close = 100 + np.cumsum(rng.normal(0, 1, count))
+    return timestamp, close
+
+
+def test_arima_online_update_matches_batch_fit():
+    timestamp, close = series(600)
+    online = ArimaForecaster().fit(timestamp[:400], close[:400])
+    online.update(timestamp[400:], close[400:])
+    batch = ArimaForecaster().fit(timestamp, close)
+
+    # С forgetting=1 рекурсивный МНК дает те же коэффициенты, что МНК по всему ряду
+    assert np.allclose(online.coef, batch.coef, rtol=1e-6, atol=1e-9)
+    assert np.allclose(online.predict(20), batch.predict(20), rtol=1e-6)
+    assert online.last_timestamp == batch.last_timestamp
+
+
+def test_arima_forgetting_weights_recent_candles():
+    timestamp, close = series(600)
+    forgetting = ArimaForecaster(forgetting=0.95).fit(timestamp[:400], close[:400])
+    forgetting.update(timestamp[400:], close[400:])
+    batch = ArimaForecaster().fit(timestamp, close)
+    assert not np.allclose(forgetting.coef, batch.coef, rtol=1e-3)
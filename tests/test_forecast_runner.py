@@ -0,0 +1,54 @@
+import threading
+import time
+from concurrent.futures import wait
+import numpy as np
+from forecast.cache import ForecastCache, make_key
+from forecast.runner import ForecastRunner
+
+STEP_MS = 60_000
+
+
+def series(count):
+    rng = np.random.default_rng(0)
+    timestamp = np.arange(count, dtype=np.int64) * STEP_MS
+    close = 100 + np.cumsum(rng.normal(0, 1, count))
+    return timestamp, close
+
+
+def wait_for(condition, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError
+        time.sleep(0.01)
+
+
+def test_superseded_result_is_cached_but_not_shown():
+    timestamp, close = series(400)
+    cache = ForecastCache(directory=None)
+    runner = ForecastRunner(workers=1, cache=cache)
+    shown = []
+    finished = threading.Event()
+    try:
+        first_key = make_key("BTCUSDT", 1, timestamp[299], "ARIMA", {}, 10)
+        first = runner.submit("ARIMA", {}, timestamp[:300], close[:300], 10,
+                              on_done=shown.append, on_error=shown.append, cache_key=first_key)
+        # Первый прогноз уже считается - новый запрос не может снять его с очереди
+        wait_for(first.running)
+
+        second_key = make_key("BTCUSDT", 1, timestamp[-1], "ARIMA", {}, 10)
+        second = runner.submit("ARIMA", {}, timestamp, close, 10,
+                               on_done=lambda result: (shown.append(result), finished.set()),
+                               on_error=shown.append, cache_key=second_key)
+        assert second is not None and not first.cancelled()
+
+        wait([first, second], timeout=30)
+        assert finished.wait(30)
+        wait_for(lambda: len(cache) == 2)
+    finally:
+        runner.shutdown()
+
+    assert [result.timestamp for result in shown] == [int(timestamp[-1])]
+    assert cache.get(first_key)[0].timestamp == int(timestamp[299])
+    # Запомнена модель по более новым свечам, даже если старый результат пришел позже
+    assert runner.model[1].last_timestamp == int(timestamp[-1])
@@ -0,0 +1,65 @@
+import json
+import threading
+import time
+from data import fetch_data
+from data.fetch_data import fetch_candles_range
+from data.preprocess_data import parse_candles
+from data.stream import KlineStream, kline_topic
+from tools.fake_bybit_rest import FakeBybitRest
+from tools.fake_bybit_ws import FakeBybitServer
+
+STEP_MS = 60_000
+START_MS = 1_700_000_040_000
+
+
+def kline_rows(count):
+    return [[str(START_MS + i * STEP_MS), f"{100 + i}", f"{101 + i}", f"{99 + i}", f"{100.5 + i}", "1", "100"]
+            for i in range(count)]
+
+
+def kline_message(row, symbol="BTCUSDT"):
+    fields = dict(zip(['start', 'open', 'high', 'low', 'close', 'volume', 'turnover'], row))
+    fields['start'] = int(fields['start'])
+    return json.dumps({'topic': kline_topic(symbol), 'type': 'snapshot', 'data': [fields]})
+
+
+def test_stream_resumes_without_gap_after_disconnect(monkeypatch):
+    rows = kline_rows(10)
+    rest = FakeBybitRest(rows).start()
+    monkeypatch.setattr(fetch_data, 'BYBIT_API_URL', rest.url)
+    # Свечи 0-2 до разрыва, 3-5 пропущены, пока соединения не было, 6-9 после переподключения
+    messages = [(0.0, kline_message(row)) for row in rows[:3] + rows[6:]]
+    server = FakeBybitServer(messages, drop_after=3).start()
+
+    received = {}
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def on_candles(symbol, candle_rows):
+        with lock:
+            for timestamp in parse_candles(candle_rows)['timestamp']:
+                received[int(timestamp)] = symbol
+            if START_MS + 9 * STEP_MS in received:
+                done.set()
+
+    def on_connect():
+        # Как Watchlist._refresh: догрузка через REST от последней полученной свечи
+        with lock:
+            last = max(received, default=None)
+        if last is not None:
+            on_candles("BTCUSDT", fetch_candles_range(last, rest.bounds[1], concurrent=False, verbose=False))
+
+    stream = KlineStream(on_candles, on_connect=on_connect, url=server.url, symbols=["BTCUSDT"],
+                         ping_interval=1, reconnect_delay=0.1)
+    stream.start()
+    try:
+        assert done.wait(10)
+    finally:
+        stream.stop()
+        server.close()
+        rest.shutdown()
+
+    assert server.connections == 2
+    assert server.subscriptions == [kline_topic("BTCUSDT")] * 2
+    assert sorted(received) == [START_MS + i * STEP_MS for i in range(10)]
+    assert set(received.values()) == {"BTCUSDT"}
@@ -0,0 +1,151 @@
+"""Локальный HTTP-сервер, отвечающий на /v5/market/kline как Bybit, по записанным или синтетическим свечам
+
+Запись:        python -m tools.fake_bybit_rest record klines.json --hours 24
+Сервер:        python -m tools.fake_bybit_rest serve --fixture klines.json --candles 100000 --port 8080
+Приложение/загрузка обращается к http://127.0.0.1:8080 (data.fetch_data.BYBIT_API_URL).
+"""
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+
+STEP_MS = 60 * 1000
+
+
+def record(path, hours, symbol, category):
+    """Запись свечей реального API за последние hours часов (строки result.list, от старых к новым)"""
+    from datetime import datetime, timedelta
+    from data.fetch_data import fetch_candles_range
+
+    end_time = datetime.now()
+    start_time = end_time - timedelta(hours=hours)
+    rows = fetch_candles_range(int(start_time.timestamp() * 1000), int(end_time.timestamp() * 1000),
+                               symbol=symbol, category=category)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(rows, f)
+    print(f"\nЗаписано свечей: {len(rows)}")
+
+
+def load_rows(path):
+    """Свечи записи: список строк Bybit, отсортированный по времени"""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):  # Сохраненный целиком ответ API
+        data = data['result']['list']
+    return sorted(data, key=lambda row: int(row[0]))
+
+
+def tile_rows(rows, count):
+    """Запись, повторенная со сдвигом времени до count свечей подряд"""
+    if count <= len(rows):
+        return rows[-count:]
+    first, last = int(rows[0][0]), int(rows[-1][0])
+    span = last - first + STEP_MS
+    tiled = []
+    for k in range(-(-count // len(rows))):
+        tiled.extend([str(int(row[0]) + k * span)] + row[1:] for row in rows)
+    return tiled[:count]
+
+
+def synthetic_rows(count, start_ms=1_699_999_980_000, seed=0):
+    """Синтетические свечи в формате строк Bybit (случайное блуждание цены)"""
+    from benchmarks.synthetic import make_candles
+
+    df = make_candles(count, start_ms=start_ms, seed=seed)
+    return [[str(ts), f"{o:.2f}", f"{h:.2f}", f"{l:.2f}", f"{c:.2f}", f"{v:.6f}", f"{t:.4f}"]
+            for ts, o, h, l, c, v, t in df[['timestamp', 'open', 'high', 'low', 'close', 'volume',
+                                            'turnover']].itertuples(index=False)]
+
+
+class KlineHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != '/v5/market/kline':
+            self.send_error(404)
+            return
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        self.server.requests += 1
+
+        # Как Bybit: не больше limit самых новых свечей окна [start, end], от новых к старым
+        timestamps = self.server.timestamps
+        lo = np.searchsorted(timestamps, int(query.get('start', timestamps[0])))
+        hi = np.searchsorted(timestamps, int(query.get('end', timestamps[-1])), side='right')
+        lo = max(lo, hi - int(query.get('limit', 200)))
+        body = json.dumps({
+            'retCode': 0,
+            'retMsg': 'OK',
+            'result': {'category': query.get('category'), 'symbol': query.get('symbol'),
+                       'list': self.server.rows[lo:hi][::-1]}
+        }).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeBybitRest(ThreadingHTTPServer):
+    """Сервер свечей rows (строки Bybit по возрастанию времени) для всех символов и категорий"""
+
+    daemon_threads = True
+
+    def __init__(self, rows, host='127.0.0.1', port=0):
+        super().__init__((host, port), KlineHandler)
+        self.rows = rows
+        self.timestamps = np.array([int(row[0]) for row in rows], dtype=np.int64)
+        self.requests = 0
+        self.url = f"http://{host}:{self.server_address[1]}"
+
+    @property
+    def bounds(self):
+        """Время первой и последней свечи (мс)"""
+        return int(self.timestamps[0]), int(self.timestamps[-1])
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    rec = sub.add_parser('record', help="Записать свечи реального API")
+    rec.add_argument('path')
+    rec.add_argument('--hours', type=float, default=24)
+    rec.add_argument('--symbol', default="BTCUSDT")
+    rec.add_argument('--category', default="spot")
+
+    serve = sub.add_parser('serve', help="Отдавать свечи локально")
+    serve.add_argument('--fixture', default=None, help="Запись (без нее - синтетические свечи)")
+    serve.add_argument('--candles', type=int, default=None, help="Количество свечей (запись повторяется)")
+    serve.add_argument('--port', type=int, default=8080)
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        record(args.path, args.hours, args.symbol, args.category)
+        return
+
+    if args.fixture:
+        rows = load_rows(args.fixture)
+        rows = tile_rows(rows, args.candles or len(rows))
+    else:
+        rows = synthetic_rows(args.candles or 24 * 60)
+    server = FakeBybitRest(rows, port=args.port)
+    start_ms, end_ms = server.bounds
+    # Первая строка - для запускающего процесса (benchmarks.suite): адрес и диапазон свечей
+    print(f"{server.url} {start_ms} {end_ms}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
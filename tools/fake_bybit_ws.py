@@ -0,0 +1,204 @@
+"""Локальный WebSocket-сервер, воспроизводящий записанные сообщения Bybit v5
+
+Запись:        python -m tools.fake_bybit_ws record messages.jsonl --seconds 120
+Воспроизведение: python -m tools.fake_bybit_ws serve messages.jsonl --port 8765 --speed 10
+Приложение/стрим подключается к ws://127.0.0.1:8765 (KlineStream(url=...)).
+"""
+import argparse
+import base64
+import hashlib
+import json
+import socket
+import struct
+import threading
+import time
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def load_messages(path):
+    """Чтение записи: по одному JSON-сообщению на строку, с отметкой времени получения"""
+    messages = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                entry = json.loads(line)
+                messages.append((entry['received'], entry['message']))
+    return messages
+
+
+def record(path, url, topic, seconds):
+    """Запись сообщений реального стрима Bybit в файл для последующего воспроизведения"""
+    import websocket
+
+    ws = websocket.create_connection(url, timeout=5)
+    ws.send(json.dumps({'op': 'subscribe', 'args': [topic]}))
+    deadline = time.time() + seconds
+    with open(path, 'w', encoding='utf-8') as f:
+        while time.time() < deadline:
+            try:
+                message = ws.recv()
+            except websocket.WebSocketTimeoutException:
+                continue
+            f.write(json.dumps({'received': time.time(), 'message': message}, ensure_ascii=False) + "\n")
+    ws.close()
+
+
+def send_frame(conn, text):
+    """Отправка текстового фрейма (сервер фреймы не маскирует)"""
+    payload = text.encode('utf-8')
+    header = bytes([0x81])
+    if len(payload) < 126:
+        header += bytes([len(payload)])
+    elif len(payload) < 65536:
+        header += bytes([126]) + struct.pack('>H', len(payload))
+    else:
+        header += bytes([127]) + struct.pack('>Q', len(payload))
+    conn.sendall(header + payload)
+
+
+def recv_exact(conn, size):
+    data = b''
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Клиент закрыл соединение")
+        data += chunk
+    return data
+
+
+def recv_frame(conn):
+    """Чтение фрейма клиента, возвращает (opcode, payload)"""
+    first, second = recv_exact(conn, 2)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack('>H', recv_exact(conn, 2))[0]
+    elif length == 127:
+        length = struct.unpack('>Q', recv_exact(conn, 8))[0]
+    mask = recv_exact(conn, 4) if second & 0x80 else b'\x00' * 4
+    payload = bytes(b ^ mask[i % 4] for i, b in enumerate(recv_exact(conn, length)))
+    return first & 0x0F, payload
+
+
+def handshake(conn):
+    """HTTP Upgrade до WebSocket"""
+    request = b''
+    while b'\r\n\r\n' not in request:
+        chunk = conn.recv(4096)
+        if not chunk:
+            raise ConnectionError("Клиент закрыл соединение")
+        request += chunk
+    headers = {}
+    for line in request.decode('latin-1').split('\r\n')[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    accept = base64.b64encode(hashlib.sha1((headers['sec-websocket-key'] + WS_GUID).encode()).digest()).decode()
+    conn.sendall((
+        "HTTP/1.1 101 Switching Protocols\r\n"
+        "Upgrade: websocket\r\n"
+        "Connection: Upgrade\r\n"
+        f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+    ).encode())
+
+
+class FakeBybitServer:
+    """Сервер, отдающий каждому клиенту записанные сообщения с ускорением speed.
+
+    drop_after - разрывать соединение после N сообщений (проверка переподключения).
+    """
+
+    def __init__(self, messages, host='127.0.0.1', port=0, speed=1.0, drop_after=None):
+        self.messages = messages
+        self.speed = speed
+        self.drop_after = drop_after
+        self.connections = 0
+        self.subscriptions = []
+        self.sock = socket.create_server((host, port))
+        self.url = f"ws://{host}:{self.sock.getsockname()[1]}"
+        self._offset = 0  # Позиция в записи - после разрыва продолжаем с нее
+        self._lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def serve_forever(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def close(self):
+        self.sock.close()
+
+    def _handle(self, conn):
+        try:
+            handshake(conn)
+            self.connections += 1
+            opcode, payload = recv_frame(conn)
+            request = json.loads(payload)
+            self.subscriptions.extend(request.get('args', []))
+            send_frame(conn, json.dumps({'success': True, 'op': 'subscribe', 'ret_msg': ''}))
+            self._replay(conn)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    def _replay(self, conn):
+        sent = 0
+        while True:
+            with self._lock:
+                if self._offset >= len(self.messages):
+                    break
+                index = self._offset
+                self._offset += 1
+            if index > 0:
+                gap = self.messages[index][0] - self.messages[index - 1][0]
+                time.sleep(max(0.0, gap) / self.speed)
+            send_frame(conn, self.messages[index][1])
+            sent += 1
+            if self.drop_after and sent >= self.drop_after:
+                return
+        # Запись закончилась - держим соединение, пока клиент не уйдет
+        while True:
+            opcode, _ = recv_frame(conn)
+            if opcode == 0x8:
+                return
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    rec = sub.add_parser('record', help="Записать сообщения реального стрима")
+    rec.add_argument('path')
+    rec.add_argument('--url', default="wss://stream.bybit.com/v5/public/spot")
+    rec.add_argument('--topic', default="kline.1.BTCUSDT")
+    rec.add_argument('--seconds', type=float, default=60)
+
+    serve = sub.add_parser('serve', help="Воспроизвести запись локально")
+    serve.add_argument('path')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--speed', type=float, default=1.0)
+    serve.add_argument('--drop-after', type=int, default=None)
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        record(args.path, args.url, args.topic, args.seconds)
+    else:
+        server = FakeBybitServer(load_messages(args.path), port=args.port,
+                                 speed=args.speed, drop_after=args.drop_after)
+        print(f"Сервер запущен: {server.url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.close()
+
+
+if __name__ == "__main__":
+    main()